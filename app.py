@@ -10,30 +10,77 @@ import sys
 import time
 import json
 import logging
+import logging.handlers
+import atexit
 import sqlite3
 import threading
 import queue
+import itertools
+import hashlib
+import math
+import socket
+import multiprocessing
+import functools
+import random
+import heapq
+import bisect
+import base64
 import requests
 import re
 from datetime import datetime
-from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.parse import urljoin, urlparse, urldefrag, parse_qsl, urlencode, unquote, quote
 from urllib.robotparser import RobotFileParser
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Set, Dict, List, Optional
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
 from bs4 import BeautifulSoup
+try:
+    # selectolax(lexbor)为C实现的HTML解析器，比BeautifulSoup快一个数量级
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+try:
+    # resource模块只在类Unix系统上可用，用于调整进程可打开的文件描述符数量
+    import resource
+except ImportError:
+    resource = None
+try:
+    # orjson序列化速度明显快于标准库json
+    import orjson
+except ImportError:
+    orjson = None
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # 配置日志 - 只输出到控制台，不保存到文件
+# 日志记录先放入队列，由后台监听线程写入控制台，SocketIO事件处理和爬虫工作线程不会阻塞在stdout写入上
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))  # 只合并消息和异常堆栈，前缀由console_handler添加
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.StreamHandler(sys.stdout)
+        queue_handler
     ]
 )
+log_listener = logging.handlers.QueueListener(log_queue, console_handler)
+log_listener.start()
+atexit.register(log_listener.stop)  # 退出前写完队列中剩余的日志
+
+def _log_directly_in_child():
+    """fork出的解析子进程中没有监听线程，改为直接写控制台"""
+    logging.getLogger().handlers = [console_handler]
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_log_directly_in_child)
 logger = logging.getLogger(__name__)
 
 # 设置werkzeug和SocketIO日志级别，减少相关的错误日志
@@ -45,8 +92,54 @@ logging.getLogger('engineio').setLevel(logging.WARNING)
 app = Flask(__name__, static_folder='web', static_url_path='')
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 CORS(app)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """用orjson实现Flask的JSON序列化，jsonify返回的URL列表等大结果编码更快
+
+    orjson不支持的类型（如Decimal）仍交给Flask默认的转换函数处理。
+    """
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+
+class OrjsonJSON:
+    """供SocketIO编码消息使用的orjson包装，接口与标准库json的dumps/loads兼容"""
+    
+    @staticmethod
+    def dumps(obj, *args, **kwargs) -> str:
+        # 线程统计等字典使用整数键，需要OPT_NON_STR_KEYS
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
 # 启用SocketIO用于WebSocket实时通信
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# 爬虫工作线程是真实的OS线程（阻塞I/O、SQLite、HTML解析），因此保持threading模式；
+# 安装simple-websocket后threading模式也支持原生WebSocket传输，无需退化为长轮询
+# simple-websocket会与浏览器协商permessage-deflate压缩；长轮询响应超过1KB时由engineio自动gzip压缩
+# 监控数据按任务房间推送，每次emit只编码一次
+socketio_options = {'json': OrjsonJSON} if orjson else {}
+# 设置REDIS_URL时通过Redis消息队列分发房间推送（需安装redis包），多个服务进程的客户端都能收到。
+# 注意运行中的爬虫只存在于启动它的进程内，任务控制接口仍需由同一进程处理
+if os.environ.get('REDIS_URL'):
+    socketio_options['message_queue'] = os.environ['REDIS_URL']
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', **socketio_options)
+
+# 浏览器常见的自动请求文件，不存在时返回204而不是404
+COMMON_BROWSER_FILES = frozenset({
+    'favicon.ico', 'robots.txt', 'sitemap.xml', 'apple-touch-icon.png',
+    'manifest.json', 'sw.js', 'service-worker.js'
+})
 
 # Flask错误处理
 @app.errorhandler(404)
@@ -58,11 +151,8 @@ def handle_404(e):
     if request.path.startswith('/api/'):
         return jsonify({'success': False, 'error': 'API endpoint not found'}), 404
     
-    # 对于常见的浏览器请求文件，返回204而不是404
-    common_files = ['favicon.ico', 'robots.txt', 'sitemap.xml', 'apple-touch-icon.png', 
-                   'manifest.json', 'sw.js', 'service-worker.js']
-    
-    if any(request.path.endswith(f'/{f}') or request.path == f'/{f}' for f in common_files):
+    # 对于常见的浏览器请求文件（任意目录下），返回204而不是404
+    if request.path.rsplit('/', 1)[-1] in COMMON_BROWSER_FILES:
         logger.debug(f"Returning 204 for common browser request: {request.path}")
         return '', 204
     
@@ -84,24 +174,290 @@ def handle_exception(e):
 
 # 数据库配置
 DB_PATH = 'crawler.db'
+EXPORT_BATCH_SIZE = 1000  # 导出任务数据时每批读取并输出的记录数
 
 # 全局爬虫任务字典
+# 只有增删条目（启动、停止、删除、清理任务）需要持有crawler_lock；只读查找单个爬虫时
+# dict的get/in操作本身是原子的，不加锁，避免监控请求被其他任务的启停操作阻塞
 active_crawlers: Dict[int, 'CrawlerThread'] = {}
 crawler_lock = threading.Lock()
 
+# 任务统计/分析结果缓存：{(类型, 任务ID): (缓存时间, 是否运行中, 结果)}
+# 运行中的任务结果只缓存很短时间；空闲任务的结果一直有效，直到任务结束、重置或删除时失效
+STATS_CACHE_TTL = 2.0  # 运行中任务的缓存有效期（秒）
+stats_cache: Dict[tuple, tuple] = {}
+stats_cache_lock = threading.Lock()
+
+# 任务统计和数据分析接口的查询语句，SQL文本固定不变，连接的语句缓存可直接复用已编译的语句
+STATS_SQL = {
+    'file_types': '''
+        SELECT content_type, COUNT(*) as count, SUM(file_size) as total_size
+        FROM url_records
+        WHERE task_id = ? AND status = 'completed'
+        GROUP BY content_type
+        ORDER BY count DESC
+        ''',
+    'domain_count': '''
+        SELECT COUNT(DISTINCT domain) as domain_count
+        FROM url_records
+        WHERE task_id = ?
+        ''',
+    'status_stats': '''
+        SELECT status, COUNT(*) as count
+        FROM url_records
+        WHERE task_id = ?
+        GROUP BY status
+        ''',
+    'depth_distribution': '''
+        SELECT depth, COUNT(*) as count 
+        FROM url_records 
+        WHERE task_id = ? AND status = 'completed'
+        GROUP BY depth 
+        ORDER BY depth
+        ''',
+    'histograms': 'SELECT size_buckets, time_buckets FROM task_histograms WHERE task_id = ?',
+    'popularity_distribution': '''
+        SELECT 
+            CASE 
+                WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 100 THEN 0
+                WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 1000 THEN 1
+                WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 10000 THEN 2
+                WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 100000 THEN 3
+                ELSE 4
+            END as popularity_range,
+            COUNT(*) as count
+        FROM url_records 
+        WHERE task_id = ? AND status = 'completed' 
+            AND metadata IS NOT NULL 
+            AND JSON_EXTRACT(metadata, '$.popularity_score') IS NOT NULL
+            AND CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) > 0
+        GROUP BY popularity_range
+        ORDER BY popularity_range
+        ''',
+    'top_popular_urls': '''
+        SELECT url, title, 
+               CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) as popularity_score,
+               CAST(JSON_EXTRACT(metadata, '$.view_count') AS INTEGER) as view_count,
+               CAST(JSON_EXTRACT(metadata, '$.like_count') AS INTEGER) as like_count
+        FROM url_records 
+        WHERE task_id = ? AND status = 'completed' 
+            AND metadata IS NOT NULL 
+            AND JSON_EXTRACT(metadata, '$.popularity_score') IS NOT NULL
+            AND CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) > 0
+        ORDER BY CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) DESC
+        LIMIT 10
+        ''',
+}
+
+# robots.txt解析器缓存，所有任务共享：{域名: (加载时间, 解析器)}，加载失败时解析器为None
+ROBOTS_CACHE_TTL = 3600  # 缓存有效期（秒）
+robots_cache: Dict[str, tuple] = {}
+robots_lock = threading.Lock()
+
+
+def get_cached_stats(kind: str, task_id: int):
+    """返回仍然有效的缓存结果，没有时返回None"""
+    running = task_id in active_crawlers
+    with stats_cache_lock:
+        entry = stats_cache.get((kind, task_id))
+    if entry is None:
+        return None
+    cached_at, cached_running, data = entry
+    if cached_running != running:
+        return None
+    if running and time.monotonic() - cached_at > STATS_CACHE_TTL:
+        return None
+    return data
+
+
+def set_cached_stats(kind: str, task_id: int, data):
+    """缓存任务的统计/分析结果"""
+    with stats_cache_lock:
+        stats_cache[(kind, task_id)] = (time.monotonic(), task_id in active_crawlers, data)
+
+
+def invalidate_stats_cache(task_id: int):
+    """任务数据发生变化时清除该任务的缓存结果"""
+    with stats_cache_lock:
+        for key in [key for key in stats_cache if key[1] == task_id]:
+            del stats_cache[key]
+
+
+# DNS解析缓存：同一主机的大量请求只解析一次，HTTPS仍使用主机名做证书校验
+DNS_CACHE_TTL = 300  # 缓存有效期（秒）
+DNS_CACHE_MAX_SIZE = 10000
+dns_cache: Dict[tuple, tuple] = {}
+dns_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+
+def _cached_getaddrinfo(*args, **kwargs):
+    """带TTL缓存的socket.getaddrinfo，解析失败的结果不缓存"""
+    key = (args, tuple(sorted(kwargs.items())))
+    now = time.time()
+    with dns_lock:
+        cached = dns_cache.get(key)
+    if cached and now - cached[0] < DNS_CACHE_TTL:
+        return cached[1]
+    
+    result = _original_getaddrinfo(*args, **kwargs)
+    with dns_lock:
+        if len(dns_cache) >= DNS_CACHE_MAX_SIZE:
+            # 缓存过大时清理过期条目，仍然过大则全部清空
+            for k in [k for k, (ts, _) in dns_cache.items() if now - ts >= DNS_CACHE_TTL]:
+                del dns_cache[k]
+            if len(dns_cache) >= DNS_CACHE_MAX_SIZE:
+                dns_cache.clear()
+        dns_cache[key] = (now, result)
+    return result
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+# 文件下载接口共用的HTTP会话，重复下载同一主机的文件时复用TCP/TLS连接
+download_session = requests.Session()
+_download_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+)
+download_session.mount("http://", _download_adapter)
+download_session.mount("https://", _download_adapter)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024  # 转发下载内容的块大小
+DOWNLOAD_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive'
+}
+# 下载文件名中不允许出现的字符
+FILENAME_UNSAFE_PATTERN = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def stream_download(response):
+    """逐块转发上游响应体，不把整个文件读入内存；传输结束或客户端断开时关闭上游连接"""
+    try:
+        yield from response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE)
+    except Exception as e:
+        logger.error(f"Failed to stream download from {response.url}: {e}")
+    finally:
+        response.close()
+
+
+def retry_on_busy(max_attempts: int = 5, base: float = 0.01):
+    """数据库被锁（busy_timeout等待后仍为SQLITE_BUSY）时按指数退避重试的装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if 'database is locked' not in str(e) or attempt == max_attempts - 1:
+                        raise
+                    delay = base * 2 ** attempt + random.random() * base
+                    logger.warning(f"Database is locked, retrying in {delay:.3f}s ({attempt + 1}/{max_attempts})")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
 
 class Database:
     """数据库管理类"""
     
+    POOL_SIZE = 10  # API请求共用的连接池大小
+    STATEMENT_CACHE_SIZE = 256  # 每个连接缓存的已编译语句数，足以容纳应用中的所有SQL
+    
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
+        self._local = threading.local()  # 每个线程复用的连接
+        self._pool = queue.LifoQueue(maxsize=self.POOL_SIZE)  # 空闲连接，后进先出以复用缓存较热的连接
         self.init_database()
-    
+        self.configure_database()
+
     def get_connection(self):
         """获取数据库连接"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=self.STATEMENT_CACHE_SIZE)
         conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            # WAL模式已持久化到数据库文件，这里仅防止新建的数据库未启用
+            # synchronous、busy_timeout和mmap_size是连接级别的设置，每个连接都需要设置
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.execute('PRAGMA mmap_size=268435456')  # 256MB，映射的页由所有连接共享
+        return conn
+
+    def acquire_connection(self):
+        """从连接池借出一个连接，池中没有空闲连接时新建，用完后调用release_connection归还"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            conn = self.get_connection()
+            if self.db_path != ':memory:':
+                # 池中的连接长期存在，给每个连接更大的页缓存，临时表和排序放在内存中
+                conn.execute('PRAGMA cache_size=-20000')
+                conn.execute('PRAGMA temp_store=MEMORY')
+            return conn
+    
+    def release_connection(self, conn):
+        """归还连接，未提交的事务先回滚；连接池已满时直接关闭"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding database connection: {e}")
+            conn.close()
+    
+    @contextmanager
+    def borrow(self):
+        """借出连接池中的连接，with块结束时归还（包括抛出异常时）"""
+        conn = self.acquire_connection()
+        try:
+            yield conn
+        finally:
+            self.release_connection(conn)
+    
+    @retry_on_busy()
+    def execute_write(self, sql: str, params: tuple = ()) -> int:
+        """用连接池中的连接执行一条写语句并提交，返回影响的行数"""
+        with self.borrow() as conn:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+    
+    def get_thread_connection(self):
+        """获取当前线程复用的数据库连接，线程内首次调用时创建，调用方不要关闭
+
+        只在爬虫自己的长期线程中使用；请求线程用完即结束，应使用连接池（borrow/execute_write）。
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.get_connection()
+            self._local.conn = conn
         return conn
+
+    def configure_database(self):
+        """启用WAL模式并调优SQLite参数，让读操作不被爬虫的写操作阻塞"""
+        if self.db_path == ':memory:':
+            return
+
+        try:
+            # 只有journal_mode会持久化到数据库文件，其余PRAGMA都是连接级别的，
+            # 在get_connection/acquire_connection中对每个连接设置，在这里设置不会生效
+            conn = self.get_connection()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.close()
+            logger.info("Database configured with WAL journal mode")
+        except Exception as e:
+            logger.warning(f"Failed to configure database pragmas: {e}")
     
     def init_database(self):
         """初始化数据库表"""
@@ -121,6 +477,8 @@ class Database:
                 retry_times INTEGER DEFAULT 3,
                 respect_robots BOOLEAN DEFAULT 1,
                 allow_cross_domain BOOLEAN DEFAULT 0,
+                collapse_url_variants BOOLEAN DEFAULT 0,
+                skip_duplicate_content BOOLEAN DEFAULT 0,
                 status TEXT DEFAULT 'pending',
                 queue_status TEXT DEFAULT 'active',
                 progress REAL DEFAULT 0.0,
@@ -144,6 +502,20 @@ class Database:
             cursor.execute("ALTER TABLE tasks ADD COLUMN queue_status TEXT DEFAULT 'active'")
             logger.info("Added queue_status column to tasks table")
         
+        # 检查并添加collapse_url_variants字段（用于数据库迁移）
+        try:
+            cursor.execute("SELECT collapse_url_variants FROM tasks LIMIT 1")
+        except:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN collapse_url_variants BOOLEAN DEFAULT 0")
+            logger.info("Added collapse_url_variants column to tasks table")
+        
+        # 检查并添加skip_duplicate_content字段（用于数据库迁移）
+        try:
+            cursor.execute("SELECT skip_duplicate_content FROM tasks LIMIT 1")
+        except:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN skip_duplicate_content BOOLEAN DEFAULT 0")
+            logger.info("Added skip_duplicate_content column to tasks table")
+        
         # 创建URL记录表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS url_records (
@@ -171,9 +543,37 @@ class Database:
         # 检查并添加新列（数据库迁移）
         self.migrate_database(cursor)
         
+        # 创建任务分布统计表：文件大小和响应时间分布在爬取时累计，数据分析时直接读取
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_histograms'")
+        new_histograms = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS task_histograms (
+                task_id INTEGER PRIMARY KEY,
+                size_buckets TEXT,
+                time_buckets TEXT,
+                FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+            )
+        ''')
+        if new_histograms:
+            self.backfill_histograms(cursor)
+        
         # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_id ON url_records(task_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_url_status ON url_records(status)')
+        # 唯一索引(task_id, url)和覆盖索引(task_id, status, file_size)都以task_id开头，
+        # 单列task_id索引是多余的，只会增加每次写入的开销
+        cursor.execute('DROP INDEX IF EXISTS idx_task_id')
+        # 覆盖索引：按任务统计各状态数量和字节数时只需扫描索引，不必回表；
+        # 其(task_id, status)前缀同时服务所有按任务+状态过滤的查询
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_task_stats_cover'")
+        new_cover_index = cursor.fetchone() is None
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_stats_cover ON url_records(task_id, status, file_size)')
+        # URL列表按created_at倒序分页，按索引顺序读取到LIMIT即可停止，不必对整个任务的记录排序
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_created ON url_records(task_id, created_at)')
+        # 按任务统计域名数量时只需扫描该索引
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_domain ON url_records(task_id, domain)')
+        # URL前缀搜索不区分大小写（与LIKE一致），按NOCASE排序的索引让范围比较可以直接定位
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_task_url_nocase ON url_records(task_id, url COLLATE NOCASE)')
+        # 所有按状态的查询都带task_id，单列status索引只会增加写入开销
+        cursor.execute('DROP INDEX IF EXISTS idx_url_status')
         
         # 清理重复的URL记录（在创建唯一索引之前）
         try:
@@ -209,8 +609,27 @@ class Database:
             cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_task_url_unique ON url_records(task_id, url)')
         
         conn.commit()
+        
+        # 新建索引后收集一次统计信息，让查询规划器选用覆盖索引
+        if new_cover_index:
+            cursor.execute('ANALYZE')
+            conn.commit()
         conn.close()
     
+    def backfill_histograms(self, cursor):
+        """根据已有的URL记录计算各任务的文件大小和响应时间分布（分布统计表新建时执行一次）"""
+        histograms = {}
+        cursor.execute("SELECT task_id, file_size, response_time FROM url_records WHERE status = 'completed'")
+        for task_id, file_size, response_time in cursor.fetchall():
+            size_buckets, time_buckets = histograms.setdefault(task_id, ([0] * 5, [0] * 5))
+            CrawlerThread.add_to_histograms(size_buckets, time_buckets, file_size, response_time)
+        cursor.executemany(
+            'INSERT INTO task_histograms (task_id, size_buckets, time_buckets) VALUES (?, ?, ?)',
+            [(task_id, json.dumps(size_buckets), json.dumps(time_buckets))
+             for task_id, (size_buckets, time_buckets) in histograms.items()])
+        if histograms:
+            logger.info(f"Backfilled histograms for {len(histograms)} tasks")
+    
     def migrate_database(self, cursor):
         """数据库迁移 - 添加新列"""
         try:
@@ -225,7 +644,8 @@ class Database:
                 ('description', 'TEXT'),
                 ('keywords', 'TEXT'),
                 ('publish_time', 'TEXT'),
-                ('metadata', 'TEXT')  # 存储完整的JSON元数据
+                ('metadata', 'TEXT'),  # 存储完整的JSON元数据
+                ('domain', 'TEXT')     # URL的域名，写入时填充，用于按域名统计
             ]
             
             
@@ -234,15 +654,207 @@ class Database:
                 if column_name not in columns:
                     cursor.execute(f'ALTER TABLE url_records ADD COLUMN {column_name} {column_type}')
                     logger.info(f"Added column {column_name} to url_records table")
+            
+            # 为已有记录补填域名
+            if 'domain' not in columns:
+                cursor.connection.create_function('url_domain', 1, lambda url: urlparse(url).netloc if url else None)
+                cursor.execute('UPDATE url_records SET domain = url_domain(url) WHERE domain IS NULL')
+                logger.info(f"Backfilled domain for {cursor.rowcount} URL records")
                     
         except Exception as e:
             logger.error(f"Database migration failed: {e}", exc_info=True)
         logger.info("Database initialized successfully")
 
 
+class BloomFilter:
+    """固定容量的布隆过滤器，可能把未出现的元素误判为已存在，但不会漏判"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        # 根据容量和误判率计算位数组大小和哈希函数个数
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        """双重哈希：由128位摘要的前后两半生成k个位位置"""
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        num_bits = self.num_bits
+        return [(h1 + i * h2) % num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, digest: bytes) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    def add(self, digest: bytes):
+        bits = self.bits
+        for pos in self._positions(digest):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    """可扩展布隆过滤器，当前过滤器用满后追加容量翻倍、误判率减半的新过滤器"""
+
+    def __init__(self, initial_capacity: int = 100000, error_rate: float = 1e-6):
+        # 各层误判率依次减半，总误判率不超过error_rate
+        self.filters = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def __contains__(self, digest: bytes) -> bool:
+        return any(digest in f for f in self.filters)
+
+    def add(self, digest: bytes):
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, current.error_rate / 2)
+            self.filters.append(current)
+        current.add(digest)
+
+
+class SeenURLSet:
+    """URL去重集合
+
+    用布隆过滤器代替保存完整URL字符串的set，另保留一个有界的精确LRU。
+    布隆过滤器命中但LRU未命中时（可能是误判），交给verify回调查询数据库确认。
+    """
+
+    def __init__(self, verify=None, lru_size: int = 50000,
+                 initial_capacity: int = 100000, error_rate: float = 1e-6):
+        self.verify = verify
+        self.lru_size = lru_size
+        self.bloom = ScalableBloomFilter(initial_capacity, error_rate)
+        self.recent = OrderedDict()  # 最近加入的URL摘要
+
+    @staticmethod
+    def _digest(url: str) -> bytes:
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+    def __contains__(self, url: str) -> bool:
+        seen = self.probe(url)
+        return self.verify(url) if seen is None else seen
+
+    def probe(self, url: str) -> Optional[bool]:
+        """不查数据库的查重：返回True/False，需要verify确认时返回None
+
+        持锁的调用方用它代替in，把None的URL放到锁外调用verify，避免持锁等待数据库I/O。
+        """
+        digest = self._digest(url)
+        if digest not in self.bloom:
+            return False
+        if digest in self.recent:
+            self.recent.move_to_end(digest)
+            return True
+        return None if self.verify else True
+
+    def seed(self, url: str):
+        """只写入布隆过滤器，不占用LRU（用于从数据库批量恢复，命中时由verify确认）"""
+        digest = self._digest(url)
+        if digest not in self.bloom:
+            self.bloom.add(digest)
+    
+    def add(self, url: str):
+        digest = self._digest(url)
+        if digest not in self.bloom:
+            self.bloom.add(digest)
+        self.recent[digest] = None
+        self.recent.move_to_end(digest)
+        if len(self.recent) > self.lru_size:
+            self.recent.popitem(last=False)
+
+
 class CrawlerThread(threading.Thread):
     """多线程爬虫类"""
     
+    # 爬取请求使用的请求头
+    REQUEST_HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    # URL记录写入语句，由数据库写入线程批量执行
+    WRITE_SQL = {
+        # 同一任务中URL已存在时原地更新（UPSERT），避免INSERT OR REPLACE先删后插带来的索引重建
+        'insert_url': '''
+            INSERT INTO url_records 
+            (task_id, url, domain, depth, status, status_code, response_time, file_size, 
+             content_type, title, author, description, keywords, publish_time,
+             error_message, metadata, created_at, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(task_id, url) DO UPDATE SET
+                depth = excluded.depth, status = excluded.status, 
+                status_code = excluded.status_code, response_time = excluded.response_time, 
+                file_size = excluded.file_size, content_type = excluded.content_type, 
+                title = excluded.title, author = excluded.author, 
+                description = excluded.description, keywords = excluded.keywords, 
+                publish_time = excluded.publish_time, error_message = excluded.error_message, 
+                metadata = excluded.metadata, created_at = excluded.created_at, 
+                completed_at = excluded.completed_at
+        ''',
+        'update_url': '''
+            UPDATE url_records 
+            SET status = ?, status_code = ?, response_time = ?, file_size = ?, 
+                content_type = ?, title = ?, author = ?, description = ?, 
+                keywords = ?, publish_time = ?, error_message = ?, completed_at = ?,
+                metadata = ?
+            WHERE task_id = ? AND url = ?
+        ''',
+    }
+    WRITE_BATCH_SIZE = 500      # 单次提交的最大写操作数
+    WRITE_FLUSH_INTERVAL = 0.1  # 最长等待时间（秒），到时即提交
+    
+    MAX_HTML_SIZE = 10 * 1024 * 1024  # 单个HTML页面最多读取10MB
+    HTML_CHUNK_SIZE = 64 * 1024       # 流式读取HTML的块大小
+    
+    ROBOTS_DECISION_CACHE_SIZE = 100000  # robots.txt判定结果缓存的最大URL数
+    
+    MONITOR_PUSH_INTERVAL = 0.5    # 统计有变化时向任务房间推送监控数据的间隔（秒）
+    PROGRESS_FLUSH_INTERVAL = 2.0  # 把进度写入tasks表的最短间隔（秒）
+    
+    # 数据分析中文件大小（字节）和响应时间（秒）分布的区间边界，各分为5个区间
+    SIZE_HISTOGRAM_BOUNDS = (1024, 10240, 102400, 1048576)
+    TIME_HISTOGRAM_BOUNDS = (0.1, 0.5, 1.0, 5.0)
+    
+    # priority策略下各扩展名的优先级，未列出的为2
+    EXTENSION_PRIORITY = {'.html': 0, '.htm': 0, '.jpg': 1, '.png': 1, '.gif': 1, '.jpeg': 1}
+    
+    # 提取元数据用到的所有标签（键的判断见_metadata_keys）
+    METADATA_SELECTOR = ', '.join([
+        'title', 'time', 'a[rel~="author"]',
+        'meta[property="og:title"]', 'meta[property="article:author"]',
+        'meta[property="og:description"]', 'meta[property="article:published_time"]',
+        'meta[name="author"]', 'meta[name="description"]', 'meta[name="keywords"]',
+        'meta[itemprop="datePublished"]',
+    ])
+    
+    # 提取链接的标签及其链接属性，合并为一个选择器只遍历一次文档
+    LINK_ATTRS = {'a': 'href', 'img': 'src', 'link': 'href', 'script': 'src'}
+    LINK_SELECTOR = ', '.join(f'{tag}[{attr}]' for tag, attr in LINK_ATTRS.items())
+    # 元数据标签和链接标签在同一次遍历中取出
+    PAGE_SELECTOR = f'{METADATA_SELECTOR}, {LINK_SELECTOR}'
+    # 页面文本中出现的绝对URL（直接匹配原始字节）
+    URL_PATTERN = re.compile(rb'https?://[^\s<>"{}|\\^`\[\]]+')
+    # urlparse会删除的字符，根路径链接含有这些字符时交给urljoin处理
+    URL_UNSAFE_CHARS = frozenset('\t\r\n')
+    # 计算URL结构指纹时替换为占位符的路径段/参数值：UUID、长十六进制串（ObjectId、哈希）、纯数字ID
+    URL_VARIANT_PATTERNS = (
+        (re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'), '{uuid}'),
+        (re.compile(r'^(?=.*\d)[0-9a-fA-F]{16,}$'), '{hex}'),
+        (re.compile(r'^\d+$'), '{id}'),
+    )
+    # 计算页面内容指纹前去掉数字和空白，只有日期、计数、页码等不同的页面视为重复
+    CONTENT_NOISE_PATTERN = re.compile(rb'\d+|\s+')
+    
+    # 这些扩展名的URL先发HEAD请求，确认不是HTML时只记录大小，不再GET
+    STATIC_EXTENSIONS = (
+        '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp',
+        '.css', '.js', '.json', '.xml', '.txt', '.woff', '.woff2', '.ttf', '.eot',
+        '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+        '.zip', '.rar', '.7z', '.gz', '.tar', '.exe', '.apk', '.dmg',
+        '.mp3', '.wav', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm',
+    )
+    
     def __init__(self, task_id: int, task_config: dict, db: Database, socketio_instance):
         super().__init__()
         self.task_id = task_id
@@ -258,12 +870,29 @@ class CrawlerThread(threading.Thread):
         self.manually_stopped = False  # 标记是否手动停止
         
         # URL队列和集合
-        self.url_queue = queue.PriorityQueue()
-        self.visited_urls: Set[str] = set()      # 已开始处理的URL
-        self.queued_urls: Set[str] = set()       # 已加入队列的URL
+        # 待爬取URL的小顶堆，元素为(priority, depth, url)，所有读写都在queue_lock下进行
+        self.url_queue = []
+        self.visited_urls = SeenURLSet(verify=self._url_record_processed)  # 已开始处理的URL
+        self.queued_urls = SeenURLSet(verify=self._url_record_exists)      # 已加入队列的URL
+        # 开启collapse_url_variants时，结构相同、只有ID等不同的一组URL只入队第一个
+        self.collapse_url_variants = bool(self.config.get('collapse_url_variants', False))
+        self.url_variants = SeenURLSet()  # 已加入队列的URL结构指纹
+        self.robots_blocked_urls = SeenURLSet()  # 已记录为robots_blocked的URL
         self.failed_urls: Set[str] = set()
+        # 开启skip_duplicate_content时，内容与已解析页面重复的页面只提取链接，不再提取和保存元数据
+        self.skip_duplicate_content = bool(self.config.get('skip_duplicate_content', False))
+        self.content_fingerprints = ScalableBloomFilter()  # 已解析过的HTML内容指纹
         self.queue_lock = threading.Lock()
         
+        # 线程本地存储，每个工作线程持有独立的HTTP会话
+        self._tls = threading.local()
+        
+        # URL记录由单独的写入线程批量写入数据库，工作线程只负责入队
+        self.write_q = queue.Queue()
+        self._writer = threading.Thread(target=self._db_writer_loop,
+                                        name=f"db-writer-{task_id}", daemon=True)
+        self._writer.start()
+        
         # 统计信息 - 从数据库恢复或初始化为0
         self.total_urls_discovered = 0  # 实际加入队列的URL数量（可爬取的）
         self.total_urls_processed = 0   # 已处理的URL数量（完成+失败）
@@ -273,33 +902,62 @@ class CrawlerThread(threading.Thread):
         self.depth_blocked_count = 0    # 被深度限制阻止的URL数量
         self.duplicate_count = 0        # 重复URL数量
         self.robots_blocked_count = 0   # 被robots.txt阻止的URL数量
+        # 已完成URL的文件大小和响应时间分布（区间见SIZE_HISTOGRAM_BOUNDS/TIME_HISTOGRAM_BOUNDS）
+        self.size_histogram = [0] * 5
+        self.time_histogram = [0] * 5
+        
+        # 预先计算起始URL的域名，is_same_domain对每个链接只需从字符串中切出域名
+        base_url = self.config['url']
+        if not base_url.startswith(('http://', 'https://')):
+            base_url = 'http://' + base_url  # 如果基础URL没有协议，添加http://
+        self._base_netloc = urlparse(base_url).netloc
+        self._base_netloc_stripped = self._strip_www(self._base_netloc)
         
-        # robots.txt解析器字典，按域名存储
-        self.robot_parsers = {}
         self.respect_robots = self.config.get('respect_robots', True)
+        # robots.txt判定结果缓存：{URL: (过期时间, 是否允许)}，同一URL被多个页面引用时不再重复匹配规则
+        self._robots_decisions: Dict[str, tuple] = {}
         if self.respect_robots:
             self._init_robot_parser()
+        self.thread_stats = {}  # 各工作线程的状态和统计，每个线程只写自己的条目
         self.total_bytes = 0
-        self.response_times = []
+        self.response_times = deque(maxlen=100)  # 最近100次请求的耗时，用于计算平均响应时间
+        self._response_time_sum = 0.0            # response_times的累计和，随append增量维护
         self.last_total_bytes = 0
-        self.last_monitor_send = 0  # 上次发送监控数据的时间
+        self.last_monitor_send = 0  # 上次发送监控数据的时间（time.monotonic()）
+        # 统计数据有变化时置位，监控循环据此决定是否写库和推送
+        self._dirty = threading.Event()
+        self._dirty.set()
         
         # 从数据库恢复当前任务的统计数据
         self._restore_task_stats()
         
         # 线程池
-        self.worker_threads = []
-        self.thread_stats = {}
+        self.thread_count = self.config.get('thread_count', 3)
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0  # 已提交到线程池但尚未处理完成的URL数量
+        self._worker_ids = itertools.count()
         
+        # 爬取策略在任务运行期间不变，预先选定优先级函数，入队时不再逐个链接判断策略
+        self._url_priority = {
+            'dfs': self._dfs_priority,
+            'priority': self._type_priority,
+            'popularity': self._popularity_priority,
+        }.get(self.config.get('strategy', 'bfs'), self._bfs_priority)
+        
+        # 恢复数据库中已有的URL记录（进程重启后继续未完成的任务）
+        self._restore_seen_urls()
         
         # 初始化队列
         start_url = CrawlerThread.normalize_url(self.config['url'])
         
-        self.url_queue.put((0, 0, start_url))  # (priority, depth, url)
-        self.queued_urls.add(start_url)  # 标记起始URL为已加入队列
-        
-        # 保存起始URL记录到数据库 (深度0)
-        self.save_url_record(start_url, 0, 'pending', 0, 0, 0, '', None)
+        if start_url not in self.queued_urls:
+            heapq.heappush(self.url_queue, (0, 0, start_url))  # (priority, depth, url)
+            self.queued_urls.add(start_url)  # 标记起始URL为已加入队列
+            if self.collapse_url_variants:
+                self.url_variants.add(self.url_fingerprint(start_url))
+            
+            # 保存起始URL记录到数据库 (深度0)
+            self.save_url_record(start_url, 0, 'pending', 0, 0, 0, '', None)
         
         # 如果是新任务，设置发现URL数量为1
         if self.total_urls_discovered == 0:
@@ -343,8 +1001,16 @@ class CrawlerThread(threading.Thread):
                 FROM tasks WHERE id = ?
             ''', (self.task_id,))
             task_stats = cursor.fetchone()
+            
+            cursor.execute('SELECT size_buckets, time_buckets FROM task_histograms WHERE task_id = ?',
+                           (self.task_id,))
+            histograms = cursor.fetchone()
             conn.close()
             
+            if histograms:
+                self.size_histogram = json.loads(histograms['size_buckets'])
+                self.time_histogram = json.loads(histograms['time_buckets'])
+            
             # 优先使用URL记录统计，如果没有则使用tasks表数据
             if url_stats and url_stats['total_records'] > 0:
                 self.completed_count = url_stats['completed_count'] or 0
@@ -382,32 +1048,186 @@ class CrawlerThread(threading.Thread):
             self.failed_count = 0
             self.total_bytes = 0
             self.total_urls_processed = 0
+            self.size_histogram = [0] * 5
+            self.time_histogram = [0] * 5
+    
+    def _restore_seen_urls(self):
+        """从数据库恢复当前任务已记录的URL
+
+        所有URL写入去重过滤器（只占布隆过滤器的位，不保存URL字符串），
+        pending状态的URL重新加入队列，已处理的URL不会被重复爬取。
+        """
+        try:
+            conn = self.db.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('SELECT url, depth, status FROM url_records WHERE task_id = ?', (self.task_id,))
+            restored = 0
+            pending = 0
+            for row in cursor:
+                url = row['url']
+                depth = row['depth'] or 0
+                self.queued_urls.seed(url)
+                if self.collapse_url_variants:
+                    self.url_variants.seed(self.url_fingerprint(url))
+                if row['status'] == 'robots_blocked':
+                    self.robots_blocked_urls.seed(url)
+                if row['status'] == 'pending':
+                    heapq.heappush(self.url_queue, (self._url_priority(url, depth), depth, url))
+                    pending += 1
+                else:
+                    self.visited_urls.seed(url)
+                restored += 1
+            conn.close()
+            
+            if restored > 0:
+                logger.info(f"Task {self.task_id}: Restored {restored} URL records, {pending} pending URLs re-queued")
+        except Exception as e:
+            logger.error(f"Failed to restore URL records for task {self.task_id}: {e}", exc_info=True)
+    
+    @property
+    def total_bytes(self) -> int:
+        """已下载字节数：恢复的基数加上各工作线程的字节统计"""
+        return self._restored_bytes + sum(stats['bytes'] for stats in list(self.thread_stats.values()))
+    
+    @total_bytes.setter
+    def total_bytes(self, value: int):
+        # 只在恢复统计时设置，此时各线程的字节统计都为0
+        self._restored_bytes = value
+    
+    def _record_response_time(self, elapsed: float):
+        """记录一次请求耗时，同时维护窗口内的累计和（调用方需持有queue_lock）"""
+        if len(self.response_times) == self.response_times.maxlen:
+            self._response_time_sum -= self.response_times[0]
+        self.response_times.append(elapsed)
+        self._response_time_sum += elapsed
+    
+    @classmethod
+    def add_to_histograms(cls, size_buckets: list, time_buckets: list, file_size, response_time):
+        """把一条已完成的URL记录计入文件大小和响应时间分布，大小或耗时为0的不计入"""
+        if file_size and file_size > 0:
+            size_buckets[bisect.bisect_right(cls.SIZE_HISTOGRAM_BOUNDS, file_size)] += 1
+        if response_time and response_time > 0:
+            time_buckets[bisect.bisect_right(cls.TIME_HISTOGRAM_BOUNDS, response_time)] += 1
+    
+    def avg_response_time(self) -> float:
+        """最近100次请求的平均耗时"""
+        count = len(self.response_times)
+        return self._response_time_sum / count if count else 0
+    
+    # 各爬取策略的优先级函数，参数均为(url, depth, parent_popularity)，数值越小越先爬取
+    @staticmethod
+    def _bfs_priority(url: str, depth: int, parent_popularity: int = 0) -> int:
+        return depth  # 广度优先：深度越小优先级越高
+    
+    @staticmethod
+    def _dfs_priority(url: str, depth: int, parent_popularity: int = 0) -> int:
+        return -depth  # 深度优先：深度越大优先级越高
+    
+    @staticmethod
+    def _type_priority(url: str, depth: int, parent_popularity: int = 0) -> int:
+        # 优先级策略：HTML > 图片 > 其他，按最后一个点之后的扩展名查表
+        dot = url.rfind('.')
+        if dot < 0 or '/' in url[dot:]:
+            return 0 if url.endswith('/') else 2  # 最后一段没有扩展名
+        return CrawlerThread.EXTENSION_PRIORITY.get(url[dot:], 2)
     
+    @staticmethod
+    def _popularity_priority(url: str, depth: int, parent_popularity: int = 0) -> int:
+        # 热度优先：基于父页面热度计算子链接优先级
+        # 优先级 = -(父页面热度 - 深度惩罚)
+        # 热度越高、深度越浅的链接优先级越高（堆中数值越小优先级越高）
+        depth_penalty = depth * 1000  # 每增加一层深度，降低1000分优先级
+        return -(parent_popularity - depth_penalty)
+    
+    def _mark_queued(self, url: str, fingerprint: Optional[str]) -> bool:
+        """把URL标记为已加入队列，结构相同的URL已入队过时返回False；调用方需持有queue_lock"""
+        if fingerprint is not None:
+            # 结构相同的URL已入队过，只是ID不同，同样视为重复
+            if fingerprint in self.url_variants:
+                return False
+            self.url_variants.add(fingerprint)
+        self.queued_urls.add(url)
+        return True
+
+    @contextmanager
+    def _read_connection(self):
+        """爬虫自己的线程（主线程和工作线程）复用线程连接，其他线程（如执行__init__的请求线程）借用连接池的连接"""
+        if getattr(self._tls, 'owned', False):
+            yield self.db.get_thread_connection()
+        else:
+            with self.db.borrow() as conn:
+                yield conn
+
+    def _url_record_exists(self, url: str) -> bool:
+        """数据库中是否已有该URL的记录（布隆过滤器命中时用于确认）"""
+        try:
+            with self._read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT 1 FROM url_records WHERE task_id = ? AND url = ? LIMIT 1',
+                               (self.task_id, url))
+                row = cursor.fetchone()
+            return row is not None
+        except Exception as e:
+            logger.warning(f"Failed to check URL record for {url}: {e}")
+            return True
+
+    def _url_record_processed(self, url: str) -> bool:
+        """数据库中该URL是否已处理过，即不再是pending状态（布隆过滤器命中时用于确认）"""
+        try:
+            with self._read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT 1 FROM url_records
+                    WHERE task_id = ? AND url = ? AND status != 'pending' LIMIT 1
+                ''', (self.task_id, url))
+                row = cursor.fetchone()
+            return row is not None
+        except Exception as e:
+            logger.warning(f"Failed to check URL record for {url}: {e}")
+            return True
+
     def _init_robot_parser(self):
         """初始化起始域名的robots.txt解析器"""
         try:
             parsed = urlparse(self.config['url'])
             domain = f"{parsed.scheme}://{parsed.netloc}"
-            self._load_robots_for_domain(domain)
+            self._get_robot_parser(domain)
         except Exception as e:
             logger.warning(f"Task {self.task_id}: Failed to initialize robots parser: {e}")
     
-    def _load_robots_for_domain(self, domain: str):
-        """为指定域名加载robots.txt"""
-        if domain in self.robot_parsers:
-            return  # 已经加载过
-        
+    def _get_robot_parser(self, domain: str) -> Optional[RobotFileParser]:
+        """获取指定域名的robots.txt解析器，缓存未过期时直接复用"""
+        with robots_lock:
+            cached = robots_cache.get(domain)
+        if cached and time.time() - cached[0] < ROBOTS_CACHE_TTL:
+            return cached[1]
+        
+        robot_parser = self._load_robots_for_domain(domain)
+        with robots_lock:
+            robots_cache[domain] = (time.time(), robot_parser)
+        return robot_parser
+    
+    def _load_robots_for_domain(self, domain: str) -> Optional[RobotFileParser]:
+        """为指定域名下载并解析robots.txt，失败时返回None"""
         try:
             robots_url = f"{domain}/robots.txt"
-            robot_parser = RobotFileParser()
-            robot_parser.set_url(robots_url)
-            robot_parser.read()
+            robot_parser = RobotFileParser(robots_url)
+            response = requests.get(robots_url, headers=self.REQUEST_HEADERS, timeout=5)
+            
+            # 与RobotFileParser.read()的处理方式保持一致
+            if response.status_code in (401, 403):
+                robot_parser.disallow_all = True
+            elif 400 <= response.status_code < 500:
+                robot_parser.allow_all = True
+            else:
+                response.raise_for_status()
+                robot_parser.parse(response.content.decode('utf-8', errors='ignore').splitlines())
             
-            self.robot_parsers[domain] = robot_parser
             logger.info(f"Task {self.task_id}: Loaded robots.txt from {robots_url}")
+            return robot_parser
         except Exception as e:
             logger.warning(f"Task {self.task_id}: Failed to load robots.txt from {domain}: {e}")
-            self.robot_parsers[domain] = None
+            return None
     
     def can_fetch(self, url: str) -> bool:
         """检查URL是否被robots.txt允许爬取"""
@@ -415,46 +1235,51 @@ class CrawlerThread(threading.Thread):
         if not self.respect_robots:
             return True
         
+        now = time.time()
+        cached = self._robots_decisions.get(url)
+        if cached and cached[0] > now:
+            return cached[1]
+        
         try:
             # 获取URL的域名
             parsed = urlparse(url)
             domain = f"{parsed.scheme}://{parsed.netloc}"
             
-            # 动态加载该域名的robots.txt（如果还没加载）
-            if domain not in self.robot_parsers:
-                self._load_robots_for_domain(domain)
+            # 获取该域名的robots解析器（未缓存或已过期时动态加载）
+            robot_parser = self._get_robot_parser(domain)
+            # 如果加载失败，允许爬取；否则使用通配符User-Agent检查
+            allowed = robot_parser.can_fetch("*", url) if robot_parser else True
             
-            # 获取该域名的robots解析器
-            robot_parser = self.robot_parsers.get(domain)
-            if not robot_parser:
-                return True  # 如果加载失败，允许爬取
-            
-            # 使用通配符User-Agent检查
-            return robot_parser.can_fetch("*", url)
+            if len(self._robots_decisions) >= self.ROBOTS_DECISION_CACHE_SIZE:
+                self._robots_decisions.clear()
+            self._robots_decisions[url] = (now + ROBOTS_CACHE_TTL, allowed)
+            return allowed
         except Exception as e:
             logger.warning(f"Error checking robots.txt for {url}: {e}")
             return True
     
     def is_same_domain(self, url: str) -> bool:
-        """检查是否同域"""
-        base_url = self.config['url']
-        
-        # 如果基础URL没有协议，添加http://
-        if not base_url.startswith(('http://', 'https://')):
-            base_url = 'http://' + base_url
-            
-        base_domain = urlparse(base_url).netloc
-        url_domain = urlparse(url).netloc
+        """检查是否同域（url须为normalize_url的结果）"""
+        url_domain = self._netloc_of(url)
         
         # 移除www前缀进行比较，避免www和非www的差异
-        base_domain_clean = base_domain.replace('www.', '') if base_domain.startswith('www.') else base_domain
-        url_domain_clean = url_domain.replace('www.', '') if url_domain.startswith('www.') else url_domain
-        
-        return base_domain == url_domain or base_domain_clean == url_domain_clean
+        return (url_domain == self._base_netloc
+                or self._strip_www(url_domain) == self._base_netloc_stripped)
     
     @staticmethod
+    def _strip_www(netloc: str) -> str:
+        """移除域名开头的www."""
+        return netloc[4:] if netloc.startswith('www.') else netloc
+    
+    @staticmethod
+    def _netloc_of(url: str) -> str:
+        """返回标准化URL的netloc：normalize_url的结果总是scheme://netloc/...，直接切分字符串，不必再次urlparse"""
+        return url.split('/', 3)[2]
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=262144)
     def normalize_url(url: str) -> str:
-        """标准化URL"""
+        """标准化URL（纯函数，结果带缓存）"""
         url, _ = urldefrag(url)  # 移除fragment
         url = url.strip()
         
@@ -481,19 +1306,31 @@ class CrawlerThread(threading.Thread):
         
         return url
     
+    @classmethod
+    @functools.lru_cache(maxsize=65536)
+    def url_fingerprint(cls, url: str) -> str:
+        """URL结构指纹：路径段和查询参数值中的UUID、十六进制串、数字ID替换为占位符，参数按名称排序"""
+        def collapse(part: str) -> str:
+            for pattern, placeholder in cls.URL_VARIANT_PATTERNS:
+                if pattern.match(part):
+                    return placeholder
+            return part
+        
+        parsed = urlparse(url)
+        path = '/'.join(collapse(segment) for segment in parsed.path.split('/'))
+        params = sorted((key, collapse(value)) for key, value in parse_qsl(parsed.query, keep_blank_values=True))
+        return f"{parsed.netloc}{path}?{urlencode(params)}"
+    
     def run(self):
         """主线程运行"""
+        self._tls.owned = True  # 本线程可以使用线程连接
+        finished = False  # 是否自然完成（队列为空且没有正在处理的URL）
         try:
             # 更新任务状态
             self.update_task_status('running')
             
-            # 启动工作线程
-            thread_count = self.config.get('thread_count', 3)
-            for i in range(thread_count):
-                worker = threading.Thread(target=self.worker_run, args=(i,))
-                worker.daemon = True
-                worker.start()
-                self.worker_threads.append(worker)
+            # 初始化线程状态
+            for i in range(self.thread_count):
                 self.thread_stats[i] = {
                     'status': 'idle',
                     'current_url': '',
@@ -504,42 +1341,57 @@ class CrawlerThread(threading.Thread):
                     'last_bytes': 0  # 上次记录的字节数，用于计算增量
                 }
             
-            logger.info(f"Started {thread_count} worker threads for task {self.task_id}")
+            # 启动线程池，URL按优先级从队列中取出后提交执行
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.thread_count,
+                thread_name_prefix=f"crawl-{self.task_id}",
+                initializer=self._init_worker
+            )
+            self._dispatch()
+            
+            logger.info(f"Started thread pool with {self.thread_count} workers for task {self.task_id}")
             
-            # 监控线程状态
-            idle_count = 0  # 连续空闲检查次数
+            # 监控线程状态：统计有变化时按MONITOR_PUSH_INTERVAL推送监控数据，
+            # 进度写库的频率更低，按PROGRESS_FLUSH_INTERVAL进行
+            progress_pending = False
+            last_progress_flush = 0.0
             while not self.stopped:
-                # 检查是否完成
-                if self.url_queue.empty() and all(
-                    stat['status'] in ['idle', 'stopped'] for stat in self.thread_stats.values()
-                ):
-                    idle_count += 1
-                    if idle_count >= 3:  # 连续3次检查都是空闲状态，确认完成
-                        logger.info(f"Task {self.task_id} completed - queue empty and all threads idle")
-                        self.stopped = True  # 设置停止标志
-                        break
-                else:
-                    idle_count = 0  # 重置计数器
-                
-                # 更新进度
-                self.update_progress()
+                # 检查是否完成：队列为空且没有正在处理的URL
+                with self.queue_lock:
+                    drained = not self.url_queue and self._in_flight == 0
+                if drained and not self.paused:
+                    logger.info(f"Task {self.task_id} completed - queue empty and no URLs in flight")
+                    finished = True
+                    self.stopped = True  # 设置停止标志
+                    break
                 
-                # 发送监控数据
-                self.send_monitor_data()
+                # 统计有变化时才更新进度并发送监控数据，空闲/暂停的任务不重复推送
+                if self._dirty.is_set():
+                    self._dirty.clear()
+                    self.send_monitor_data()
+                    progress_pending = True
+                if progress_pending and time.monotonic() - last_progress_flush >= self.PROGRESS_FLUSH_INTERVAL:
+                    self.update_progress()
+                    last_progress_flush = time.monotonic()
+                    progress_pending = False
                 
-                time.sleep(2)
+                time.sleep(self.MONITOR_PUSH_INTERVAL)
             
-            # 等待所有工作线程完成
-            for worker in self.worker_threads:
-                worker.join(timeout=5)
+            # 等待正在处理的URL完成，并把剩余的URL记录写入数据库
+            self.executor.shutdown(wait=True)
+            self._stop_writer()
+            for stat in self.thread_stats.values():
+                stat['status'] = 'stopped'
+                stat['current_url'] = ''
+            self.update_progress()
             
             # 更新最终状态
             if self.manually_stopped:
                 # 手动停止
                 final_status = 'stopped'
                 logger.info(f"Task {self.task_id} finished - status: stopped (manually)")
-            elif self.stopped and idle_count >= 3:
-                # 自然完成（队列空且线程空闲）
+            elif finished:
+                # 自然完成（队列空且没有正在处理的URL）
                 final_status = 'completed'
                 logger.info(f"Task {self.task_id} finished - status: completed (naturally)")
             else:
@@ -555,6 +1407,11 @@ class CrawlerThread(threading.Thread):
             
         except Exception as e:
             logger.error(f"Crawler error for task {self.task_id}: {e}", exc_info=True)
+            self.stopped = True
+            # 与正常退出一样等待正在处理的URL结束，否则它们在写入线程停止后提交的记录会丢失
+            if self.executor:
+                self.executor.shutdown(wait=True)
+            self._stop_writer()
             self.update_task_status('failed')
             # 确保失败时也从活跃列表中移除
             self._cleanup_from_active_crawlers()
@@ -566,71 +1423,116 @@ class CrawlerThread(threading.Thread):
                 if self.task_id in active_crawlers:
                     del active_crawlers[self.task_id]
                     logger.info(f"Task {self.task_id} removed from active crawlers")
+            # 写入线程已经落盘，之前缓存的统计结果不再准确
+            invalidate_stats_cache(self.task_id)
         except Exception as e:
             logger.error(f"Failed to cleanup task {self.task_id} from active crawlers: {e}")
     
-    def worker_run(self, thread_id: int):
-        """工作线程运行"""
-        logger.info(f"Worker thread {thread_id} started for task {self.task_id}")
+    def _init_worker(self):
+        """线程池工作线程初始化，为每个线程分配编号"""
+        self._tls.thread_id = next(self._worker_ids)
+        self._tls.owned = True
+        logger.info(f"Worker thread {self._tls.thread_id} started for task {self.task_id}")
+    
+    def _dispatch(self):
+        """从URL队列中按优先级取出URL提交到线程池，同时处理的URL数不超过线程数"""
+        if self.executor is None:
+            return
         
-        while not self.stopped:
-            # 检查暂停状态
-            while self.paused and not self.stopped:
-                self.thread_stats[thread_id]['status'] = 'paused'
-                time.sleep(1)
-            
+        with self.queue_lock:
+            while (not self.stopped and not self.paused
+                   and self._in_flight < self.thread_count and self.url_queue):
+                priority, depth, url = heapq.heappop(self.url_queue)
+                try:
+                    self.executor.submit(self._process_url, depth, url)
+                except RuntimeError:
+                    # 线程池已关闭（任务正在停止）
+                    break
+                self._in_flight += 1
+    
+    def _process_url(self, depth: int, url: str):
+        """在线程池中处理单个URL"""
+        thread_id = self._tls.thread_id
+        stats = self.thread_stats[thread_id]
+        try:
             if self.stopped:
-                break
+                return
             
-            try:
-                # 获取URL
-                priority, depth, url = self.url_queue.get(timeout=1)
-                
-                # 注意：深度检查已经在加入队列时完成，这里不需要重复检查
-                
-                # 更新线程状态
-                self.thread_stats[thread_id]['status'] = 'crawling'
-                self.thread_stats[thread_id]['current_url'] = url
-                
-                # 爬取URL
-                start_time = time.time()
-                result = self.crawl_url(url, depth, thread_id)
-                elapsed = time.time() - start_time
-                
-                # 更新统计
-                if result is True:
-                    self.thread_stats[thread_id]['completed'] += 1
-                    with self.queue_lock:
-                        self.completed_count += 1
-                        self.total_urls_processed += 1
-                    self.thread_stats[thread_id]['speed'] = 1.0 / elapsed if elapsed > 0 else 0
-                    self.response_times.append(elapsed)
-                elif result is False:
-                    self.thread_stats[thread_id]['failed'] += 1
-                    with self.queue_lock:
-                        self.failed_count += 1
-                        self.total_urls_processed += 1
-                    self.thread_stats[thread_id]['speed'] = 1.0 / elapsed if elapsed > 0 else 0
-                    self.response_times.append(elapsed)
-                # result is None: URL已处理过或被跳过，不计入处理统计
-                
-                # 请求间隔（只有实际发送请求时才等待）
-                if result is not None:
-                    interval = self.config.get('request_interval', 1.0)
-                    time.sleep(interval)
-                
-                self.url_queue.task_done()
-                
-            except queue.Empty:
-                self.thread_stats[thread_id]['status'] = 'idle'
-                self.thread_stats[thread_id]['current_url'] = ''
-                continue
-            except Exception as e:
-                logger.error(f"Worker {thread_id} error: {e}", exc_info=True)
-                self.thread_stats[thread_id]['status'] = 'error'
-        
-        self.thread_stats[thread_id]['status'] = 'stopped'
-        logger.info(f"Worker thread {thread_id} stopped for task {self.task_id}")
+            # 注意：深度检查已经在加入队列时完成，这里不需要重复检查
+            
+            # 更新线程状态
+            stats['status'] = 'crawling'
+            stats['current_url'] = url
+            self._dirty.set()
+            
+            # 爬取URL
+            start_time = time.time()
+            result = self.crawl_url(url, depth, thread_id)
+            elapsed = time.time() - start_time
+            
+            # 更新统计
+            if result is True:
+                stats['completed'] += 1
+                with self.queue_lock:
+                    self.completed_count += 1
+                    self.total_urls_processed += 1
+                    self._record_response_time(elapsed)
+                stats['speed'] = 1.0 / elapsed if elapsed > 0 else 0
+            elif result is False:
+                stats['failed'] += 1
+                with self.queue_lock:
+                    self.failed_count += 1
+                    self.total_urls_processed += 1
+                    self._record_response_time(elapsed)
+                stats['speed'] = 1.0 / elapsed if elapsed > 0 else 0
+            # result is None: URL已处理过或被跳过，不计入处理统计
+            
+            # 请求间隔（只有实际发送请求时才等待）
+            if result is not None:
+                interval = self.config.get('request_interval', 1.0)
+                time.sleep(interval)
+            
+            stats['status'] = 'paused' if self.paused else 'idle'
+            stats['current_url'] = ''
+        except Exception as e:
+            logger.error(f"Worker {thread_id} error: {e}", exc_info=True)
+            stats['status'] = 'error'
+        finally:
+            self._dirty.set()
+            with self.queue_lock:
+                self._in_flight -= 1
+            # 当前URL处理完成，继续提交队列中的下一个URL
+            self._dispatch()
+    
+    def _get_session(self) -> requests.Session:
+        """获取当前工作线程的HTTP会话（每个线程一个，延迟创建）"""
+        session = getattr(self._tls, 'session', None)
+        if session is None:
+            session = requests.Session()
+            
+            # 配置重试策略
+            retry_strategy = Retry(
+                total=3,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["HEAD", "GET", "OPTIONS"]
+            )
+            
+            # 配置适配器，使用较大的连接池以复用同一主机的TCP/TLS连接
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry_strategy)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._tls.session = session
+        return session
+    
+    def _is_duplicate_content(self, content: bytes) -> bool:
+        """页面内容是否与本任务已解析过的页面重复，不重复时记录其指纹"""
+        digest = hashlib.blake2b(self.CONTENT_NOISE_PATTERN.sub(b'', content), digest_size=16).digest()
+        with self.queue_lock:
+            if digest in self.content_fingerprints:
+                return True
+            self.content_fingerprints.add(digest)
+        return False
     
     def crawl_url(self, url: str, depth: int, thread_id: int) -> bool:
         """爬取单个URL"""
@@ -639,51 +1541,57 @@ class CrawlerThread(threading.Thread):
         
         # 检查是否已经处理过（防止重复处理）
         with self.queue_lock:
-            if url in self.visited_urls:
-                logger.debug(f"URL already visited, skipping: {url}")
-                # 更新原始URL的状态为completed（避免pending残留）
-                if original_url != url:
-                    self.update_url_record(original_url, 'completed', 200, 0, 0, 'text/html', 'Duplicate (redirected or normalized)')
-                return None  # 返回None表示跳过，不计入统计
-            self.visited_urls.add(url)
+            seen = self.visited_urls.probe(url)
+            if seen is False:
+                self.visited_urls.add(url)
+        if seen is None:
+            # 布隆过滤器命中但不在LRU中，在锁外查数据库确认，其他工作线程不必等待
+            seen = self.visited_urls.verify(url)
+            if not seen:
+                with self.queue_lock:
+                    # 确认期间其他线程可能已开始处理该URL
+                    seen = self.visited_urls.probe(url) is True
+                    if not seen:
+                        self.visited_urls.add(url)
+        if seen:
+            logger.debug("URL already visited, skipping: %s", url)
+            # 更新原始URL的状态为completed（避免pending残留）
+            if original_url != url:
+                self.update_url_record(original_url, 'completed', 200, 0, 0, 'text/html', 'Duplicate (redirected or normalized)')
+            return None  # 返回None表示跳过，不计入统计
         
         # 发送请求
         retry_times = self.config.get('retry_times', 3)
         for attempt in range(retry_times):
             try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                
-                # 配置SSL和连接参数
-                import ssl
-                from requests.adapters import HTTPAdapter
-                from urllib3.util.retry import Retry
-                
-                session = requests.Session()
-                
-                # 配置重试策略
-                retry_strategy = Retry(
-                    total=3,
-                    backoff_factor=1,
-                    status_forcelist=[429, 500, 502, 503, 504],
-                    allowed_methods=["HEAD", "GET", "OPTIONS"]
-                )
-                
-                # 配置适配器
-                adapter = HTTPAdapter(max_retries=retry_strategy)
-                session.mount("http://", adapter)
-                session.mount("https://", adapter)
+                # 复用当前工作线程的会话，保持连接池和keep-alive
+                session = self._get_session()
                 
                 start_time = time.time()
-                response = session.get(
-                    url, 
-                    headers=headers, 
-                    timeout=(10, 30),  # (连接超时, 读取超时)
-                    stream=True, 
-                    allow_redirects=True,
-                    verify=True  # 验证SSL证书
-                )
+                response = None
+                if urlparse(url).path.lower().endswith(self.STATIC_EXTENSIONS):
+                    # 静态资源先用HEAD获取类型和大小，HEAD的异常与GET一样计入本次重试
+                    response = session.head(
+                        url, 
+                        headers=self.REQUEST_HEADERS, 
+                        timeout=(10, 30), 
+                        allow_redirects=True,
+                        verify=True
+                    )
+                    # 服务器不支持HEAD或实际是HTML时，仍需GET
+                    if response.status_code in (405, 501) or 'text/html' in response.headers.get('Content-Type', ''):
+                        response.close()
+                        response = None
+                
+                if response is None:
+                    response = session.get(
+                        url, 
+                        headers=self.REQUEST_HEADERS, 
+                        timeout=(10, 30),  # (连接超时, 读取超时)
+                        stream=True, 
+                        allow_redirects=True,
+                        verify=True  # 验证SSL证书
+                    )
                 response_time = time.time() - start_time
                 
                 # 获取响应信息
@@ -707,39 +1615,56 @@ class CrawlerThread(threading.Thread):
                 
                 # 只解析HTML内容
                 if 'text/html' in content_type:
-                    for chunk in response.iter_content(chunk_size=8192):
+                    content_length = int(response.headers.get('Content-Length', 0) or 0)
+                    if content_length > self.MAX_HTML_SIZE:
+                        logger.info(f"HTML too large ({content_length} bytes), only reading first {self.MAX_HTML_SIZE} bytes: {url}")
+                    
+                    buf = bytearray()
+                    for chunk in response.iter_content(chunk_size=self.HTML_CHUNK_SIZE):
                         if chunk:
-                            content += chunk
-                            file_size += len(chunk)
-                            if file_size > 10 * 1024 * 1024:  # 限制10MB
+                            # 达到上限后截断并停止读取，不再多下载
+                            buf.extend(chunk[:self.MAX_HTML_SIZE - len(buf)])
+                            if len(buf) >= self.MAX_HTML_SIZE:
                                 break
+                    response.close()
+                    content = bytes(buf)
+                    file_size = len(content)
                 else:
-                    # 其他文件类型只获取大小
+                    # 其他文件类型只获取大小（来自HEAD或GET的响应头），不读取响应体
                     file_size = int(response.headers.get('Content-Length', 0))
+                    response.close()
                 
-                self.total_bytes += file_size
-                
-                # 更新线程字节统计
+                # 更新线程字节统计（每个工作线程只写自己的统计，total_bytes读取时汇总）
                 if thread_id in self.thread_stats:
                     self.thread_stats[thread_id]['bytes'] += file_size
                 
                 # 提取元数据（仅HTML）
                 metadata = {}
+                duplicate_content = False
                 if 'text/html' in content_type and content:
+                    if self.skip_duplicate_content:
+                        duplicate_content = self._is_duplicate_content(content)
+                        if duplicate_content:
+                            logger.debug("Duplicate content, skipping metadata: %s", url)
                     try:
-                        html = content.decode('utf-8', errors='ignore')
-                        metadata = self.extract_metadata(html)
+                        # 在解析进程池中解析HTML，得到元数据和页面中的候选链接；
+                        # 重复页面的链接仍要提取（分页、日历等页面往往只有链接中的ID不同）
+                        metadata, links = parse_html_in_pool(content, links_only=duplicate_content)
                         # 获取当前页面的热度分数，用于子链接优先级计算
                         parent_popularity = metadata.get('popularity_score', 0)
                         # 不再保存内容到数据库，下载时直接重新获取
-                        self.extract_links(url, html, depth, parent_popularity)
+                        self.extract_links(url, links, depth, parent_popularity)
                     except Exception as e:
                         logger.warning(f"Failed to extract content from {url}: {e}")
                 # 不再缓存任何文件内容到数据库
                 
+                with self.queue_lock:
+                    self.add_to_histograms(self.size_histogram, self.time_histogram, file_size, response_time)
+                
                 # 更新记录状态（包含元数据）
                 self.update_url_record(url, 'completed', status_code, response_time, 
-                                      file_size, content_type, None, metadata)
+                                      file_size, content_type,
+                                      'Duplicate content' if duplicate_content else None, metadata)
                 
                 return True
                 
@@ -790,8 +1715,9 @@ class CrawlerThread(threading.Thread):
         
         return False
     
-    def extract_metadata(self, html: str) -> dict:
-        """从HTML中提取元数据"""
+    @staticmethod
+    def extract_metadata(doc, nodes: dict) -> dict:
+        """从解析后的HTML文档中提取元数据，nodes为_select_page_nodes取出的元数据节点"""
         metadata = {
             'title': '',
             'author': '',
@@ -804,66 +1730,64 @@ class CrawlerThread(threading.Thread):
         }
         
         try:
-            soup = BeautifulSoup(html, 'lxml')
-            
             # 提取标题
             # 1. <title>标签
-            title_tag = soup.find('title')
+            title_tag = nodes.get('title')
             if title_tag:
-                metadata['title'] = title_tag.get_text().strip()[:500]
+                metadata['title'] = title_tag[0].strip()[:500]
             
             # 2. og:title
-            og_title = soup.find('meta', property='og:title')
-            if og_title and og_title.get('content'):
-                metadata['title'] = og_title['content'].strip()[:500]
+            og_title = nodes.get('og:title')
+            if og_title and og_title[1].get('content'):
+                metadata['title'] = og_title[1]['content'].strip()[:500]
             
             # 提取作者
             # 1. <meta name="author">
-            author_meta = soup.find('meta', attrs={'name': 'author'})
-            if author_meta and author_meta.get('content'):
-                metadata['author'] = author_meta['content'].strip()[:200]
+            author_meta = nodes.get('author')
+            if author_meta and author_meta[1].get('content'):
+                metadata['author'] = author_meta[1]['content'].strip()[:200]
             
             # 2. article:author
-            article_author = soup.find('meta', property='article:author')
-            if article_author and article_author.get('content'):
-                metadata['author'] = article_author['content'].strip()[:200]
+            article_author = nodes.get('article:author')
+            if article_author and article_author[1].get('content'):
+                metadata['author'] = article_author[1]['content'].strip()[:200]
             
             # 3. <a rel="author">
-            author_link = soup.find('a', rel='author')
+            author_link = nodes.get('author_link')
             if author_link and not metadata['author']:
-                metadata['author'] = author_link.get_text().strip()[:200]
+                metadata['author'] = author_link[0].strip()[:200]
             
             # 提取描述/摘要
             # 1. <meta name="description">
-            desc_meta = soup.find('meta', attrs={'name': 'description'})
-            if desc_meta and desc_meta.get('content'):
-                metadata['description'] = desc_meta['content'].strip()[:1000]
+            desc_meta = nodes.get('description')
+            if desc_meta and desc_meta[1].get('content'):
+                metadata['description'] = desc_meta[1]['content'].strip()[:1000]
             
             # 2. og:description
-            og_desc = soup.find('meta', property='og:description')
-            if og_desc and og_desc.get('content'):
-                metadata['description'] = og_desc['content'].strip()[:1000]
+            og_desc = nodes.get('og:description')
+            if og_desc and og_desc[1].get('content'):
+                metadata['description'] = og_desc[1]['content'].strip()[:1000]
             
             # 提取关键词
-            keywords_meta = soup.find('meta', attrs={'name': 'keywords'})
-            if keywords_meta and keywords_meta.get('content'):
-                metadata['keywords'] = keywords_meta['content'].strip()[:500]
+            keywords_meta = nodes.get('keywords')
+            if keywords_meta and keywords_meta[1].get('content'):
+                metadata['keywords'] = keywords_meta[1]['content'].strip()[:500]
             
             # 提取发表时间
             # 1. article:published_time
-            pub_time = soup.find('meta', property='article:published_time')
-            if pub_time and pub_time.get('content'):
-                metadata['publish_time'] = pub_time['content'].strip()[:50]
+            pub_time = nodes.get('article:published_time')
+            if pub_time and pub_time[1].get('content'):
+                metadata['publish_time'] = pub_time[1]['content'].strip()[:50]
             
             # 2. <time> 标签
-            time_tag = soup.find('time')
+            time_tag = nodes.get('time')
             if time_tag and not metadata['publish_time']:
-                metadata['publish_time'] = time_tag.get('datetime', time_tag.get_text()).strip()[:50]
+                metadata['publish_time'] = (time_tag[1].get('datetime') or time_tag[0]).strip()[:50]
             
             # 3. datePublished (schema.org)
-            date_meta = soup.find('meta', attrs={'itemprop': 'datePublished'})
-            if date_meta and date_meta.get('content') and not metadata['publish_time']:
-                metadata['publish_time'] = date_meta['content'].strip()[:50]
+            date_meta = nodes.get('datePublished')
+            if date_meta and date_meta[1].get('content') and not metadata['publish_time']:
+                metadata['publish_time'] = date_meta[1]['content'].strip()[:50]
             
             # 提取热度相关信息
             # 1. 浏览量/播放量 (更全面的选择器)
@@ -879,10 +1803,10 @@ class CrawlerThread(threading.Thread):
                 '*[class*="view"]', '*[class*="play"]', '*[class*="watch"]'
             ]
             for selector in view_selectors:
-                view_elem = soup.select_one(selector)
+                view_elem = CrawlerThread._select_first(doc, selector)
                 if view_elem:
-                    view_text = view_elem.get_text().strip()
-                    view_num = self.extract_number(view_text)
+                    view_text = view_elem[0].strip()
+                    view_num = CrawlerThread.extract_number(view_text)
                     if view_num > 0:
                         metadata['view_count'] = view_num
                         break
@@ -899,10 +1823,10 @@ class CrawlerThread(threading.Thread):
                 '*[class*="like"]', '*[class*="thumb"]', '*[class*="praise"]'
             ]
             for selector in like_selectors:
-                like_elem = soup.select_one(selector)
+                like_elem = CrawlerThread._select_first(doc, selector)
                 if like_elem:
-                    like_text = like_elem.get_text().strip()
-                    like_num = self.extract_number(like_text)
+                    like_text = like_elem[0].strip()
+                    like_num = CrawlerThread.extract_number(like_text)
                     if like_num > 0:
                         metadata['like_count'] = like_num
                         break
@@ -918,7 +1842,73 @@ class CrawlerThread(threading.Thread):
         
         return metadata
     
-    def extract_number(self, text: str) -> int:
+    @staticmethod
+    def _select_page_nodes(doc) -> tuple:
+        """用一个组合选择器遍历一次文档
+        
+        Returns:
+            ({元数据键: 第一个匹配节点的(文本, 属性字典)}, 链接标签中的候选链接集合)
+        """
+        nodes = {}
+        links = set()
+        if isinstance(doc, BeautifulSoup):
+            matches = ((n.name, n.attrs, n.get_text) for n in doc.select(CrawlerThread.PAGE_SELECTOR))
+        else:
+            matches = ((n.tag, n.attributes, n.text) for n in doc.css(CrawlerThread.PAGE_SELECTOR))
+        for tag, attrs, get_text in matches:
+            link_attr = CrawlerThread.LINK_ATTRS.get(tag)
+            if link_attr and attrs.get(link_attr) is not None:
+                links.add(attrs[link_attr])
+            for key in CrawlerThread._metadata_keys(tag, attrs):
+                if key not in nodes:
+                    nodes[key] = (get_text(), attrs)
+        return nodes, links
+    
+    @staticmethod
+    def _metadata_keys(tag: str, attrs: dict) -> list:
+        """判断节点对应METADATA_SELECTOR中的哪些元数据键"""
+        if tag == 'title':
+            return ['title']
+        if tag == 'time':
+            return ['time']
+        if tag == 'a':
+            rel = attrs.get('rel') or ''
+            rel = rel.split() if isinstance(rel, str) else rel  # BeautifulSoup中rel为列表
+            return ['author_link'] if 'author' in rel else []
+        if tag != 'meta':
+            return []  # 只因链接属性被选中的<img>/<link>/<script>
+        keys = []
+        if attrs.get('property') in ('og:title', 'article:author', 'og:description', 'article:published_time'):
+            keys.append(attrs['property'])
+        if attrs.get('name') in ('author', 'description', 'keywords'):
+            keys.append(attrs['name'])
+        if attrs.get('itemprop') == 'datePublished':
+            keys.append('datePublished')
+        return keys
+    
+    @staticmethod
+    def _parse_html(html: bytes):
+        """解析HTML，优先使用selectolax，未安装或解析失败时回退到BeautifulSoup"""
+        if LexborHTMLParser is not None:
+            tree = LexborHTMLParser(html)
+            if tree.root is not None:
+                return tree
+        return BeautifulSoup(html, 'lxml')
+    
+    @staticmethod
+    def _select_first(doc, selector: str):
+        """返回第一个匹配CSS选择器的节点的(文本, 属性字典)，无匹配或选择器不受支持时返回None"""
+        try:
+            if isinstance(doc, BeautifulSoup):
+                node = doc.select_one(selector)
+                return (node.get_text(), node.attrs) if node is not None else None
+            node = doc.css_first(selector)
+            return (node.text(), node.attributes) if node is not None else None
+        except Exception:
+            return None
+    
+    @staticmethod
+    def extract_number(text: str) -> int:
         """从文本中提取数字，支持万、千等单位"""
         import re
         
@@ -955,12 +1945,17 @@ class CrawlerThread(threading.Thread):
         except:
             return 0
     
-    def extract_links(self, base_url: str, html: str, depth: int, parent_popularity: int = 0):
-        """提取页面中的链接
+    @staticmethod
+    def extract_text_urls(html: bytes) -> set:
+        """用正则提取页面文本中出现的绝对URL（未做标准化和过滤）"""
+        return {u.decode('utf-8', errors='ignore') for u in CrawlerThread.URL_PATTERN.findall(html)}
+    
+    def extract_links(self, base_url: str, links: set, depth: int, parent_popularity: int = 0):
+        """处理页面中的链接，符合条件的加入队列
         
         Args:
             base_url: 当前页面URL
-            html: 页面HTML内容
+            links: parse_html提取的候选链接
             depth: 当前页面深度
             parent_popularity: 父页面的热度分数，用于计算子链接优先级
         """
@@ -970,115 +1965,122 @@ class CrawlerThread(threading.Thread):
             return
             
         try:
-            soup = BeautifulSoup(html, 'lxml')
-            links = set()
-            
-            # 提取<a>标签
-            for tag in soup.find_all('a', href=True):
-                links.add(tag['href'])
-            
-            # 提取<img>标签
-            for tag in soup.find_all('img', src=True):
-                links.add(tag['src'])
-            
-            # 提取<link>标签
-            for tag in soup.find_all('link', href=True):
-                links.add(tag['href'])
-            
-            # 提取<script>标签
-            for tag in soup.find_all('script', src=True):
-                links.add(tag['src'])
-            
-            # 正则提取URL
-            url_pattern = r'https?://[^\s<>"{}|\\^`\[\]]+'
-            regex_urls = re.findall(url_pattern, html)
-            links.update(regex_urls)
-            
             # 处理链接
             new_urls = 0
             robots_blocked = 0
             cross_domain_blocked = 0
             depth_blocked = 0
             duplicates = 0
-            strategy = self.config.get('strategy', 'bfs')
-            
+            rows = []        # 本页面要写入数据库的URL记录，最后一次性交给写入线程
+            candidates = {}  # 通过过滤的URL -> (优先级, 结构指纹)，同一页面内归一化后重复的链接在此合并
+            entries = []     # 本页面新加入队列的(priority, depth, url)
+            blocked = []     # 被robots.txt禁止的URL
+            next_depth = depth + 1
+            max_depth = self.config.get('max_depth', 3)
+            allow_cross_domain = self.config.get('allow_cross_domain', False)
+            parsed_base = urlparse(base_url)
+            base_prefix = f"{parsed_base.scheme}://{parsed_base.netloc}"
+            
+            # 不持锁完成URL转换和各项过滤，只有查重和标记需要队列锁
             for link in links:
                 try:
-                    # 转换为绝对URL
-                    absolute_url = urljoin(base_url, link)
+                    # 转换为绝对URL：常见的绝对链接和根路径链接直接拼接，
+                    # 含./..、制表换行等需要urljoin处理的情况才调用urljoin
+                    if link.startswith(('http://', 'https://')):
+                        absolute_url = link
+                    elif link.startswith('//'):
+                        absolute_url = f"{parsed_base.scheme}:{link}"
+                    elif link.startswith('/') and '/.' not in link and not self.URL_UNSAFE_CHARS.intersection(link):
+                        absolute_url = base_prefix + link
+                    else:
+                        absolute_url = urljoin(base_url, link)
                     absolute_url = self.normalize_url(absolute_url)
                     
-                    # 检查是否已加入队列
-                    with self.queue_lock:
-                        if absolute_url in self.queued_urls:
-                            duplicates += 1
-                            continue
+                    if absolute_url in candidates:
+                        duplicates += 1
+                        continue
                     
                     # 先检查跨域（优先级最高）
-                    if not self.config.get('allow_cross_domain', False) and not self.is_same_domain(absolute_url):
+                    if not allow_cross_domain and not self.is_same_domain(absolute_url):
                         cross_domain_blocked += 1
-                        logger.debug(f"URL blocked by cross-domain policy: {absolute_url}")
+                        # 每个链接都会走到这里：debug日志使用%格式，未开启debug级别时不做字符串格式化
+                        logger.debug("URL blocked by cross-domain policy: %s", absolute_url)
                         continue
                     
                     # 再检查robots.txt（只检查本域或允许的跨域URL）
                     if not self.can_fetch(absolute_url):
                         robots_blocked += 1
-                        logger.info(f"URL blocked by robots.txt: {absolute_url}")
-                        # 保存被robots禁止的URL记录
-                        self.save_url_record(absolute_url, depth + 1, 'robots_blocked', 0, 0, 0, '', None)
+                        blocked.append(absolute_url)
                         continue
                     
                     # 检查深度限制
-                    next_depth = depth + 1
-                    max_depth = self.config.get('max_depth', 3)
                     if next_depth > max_depth:
                         depth_blocked += 1
-                        logger.debug(f"URL depth {next_depth} exceeds max_depth {max_depth}: {absolute_url}")
+                        logger.debug("URL depth %s exceeds max_depth %s: %s", next_depth, max_depth, absolute_url)
                         continue
                     
-                    # 添加到队列
-                    with self.queue_lock:
-                        # 计算优先级
-                        if strategy == 'dfs':
-                            priority = -next_depth  # 深度优先：深度越大优先级越高
-                        elif strategy == 'priority':
-                            # 优先级策略：HTML > 图片 > 其他
-                            if absolute_url.endswith(('.html', '.htm', '/')):
-                                priority = 0
-                            elif absolute_url.endswith(('.jpg', '.png', '.gif', '.jpeg')):
-                                priority = 1
-                            else:
-                                priority = 2
-                        elif strategy == 'popularity':
-                            # 热度优先：基于父页面热度计算子链接优先级
-                            # 优先级 = -(父页面热度 - 深度惩罚)
-                            # 热度越高、深度越浅的链接优先级越高（PriorityQueue中数值越小优先级越高）
-                            depth_penalty = next_depth * 1000  # 每增加一层深度，降低1000分优先级
-                            priority = -(parent_popularity - depth_penalty)
-                        else:  # bfs
-                            priority = next_depth  # 广度优先：深度越小优先级越高
-                        
-                        self.url_queue.put((priority, next_depth, absolute_url))
-                        self.queued_urls.add(absolute_url)  # 标记为已加入队列
-                        # 保存待处理状态的URL记录
-                        self.save_url_record(absolute_url, next_depth, 'pending', 0, 0, 0, '', None)
-                        new_urls += 1
+                    fingerprint = self.url_fingerprint(absolute_url) if self.collapse_url_variants else None
+                    candidates[absolute_url] = (self._url_priority(absolute_url, next_depth, parent_popularity), fingerprint)
                 
                 except Exception as e:
-                    logger.debug(f"Failed to process link {link}: {e}")
+                    logger.debug("Failed to process link %s: %s", link, e)
             
-            # 更新统计
+            # 整个页面只加一次锁：批量查重、标记为已加入队列并更新统计
+            uncertain = []  # 需要查数据库确认是否已入队的(url, 优先级, 结构指纹)
             with self.queue_lock:
-                if new_urls > 0:
-                    self.total_urls_discovered += new_urls
-                if robots_blocked > 0:
-                    self.robots_blocked_count += robots_blocked
-                if cross_domain_blocked > 0:
-                    self.cross_domain_blocked_count += cross_domain_blocked
-                if depth_blocked > 0:
-                    self.depth_blocked_count += depth_blocked
-                if duplicates > 0:
-                    self.duplicate_count += duplicates
+                for absolute_url, (priority, fingerprint) in candidates.items():
+                    seen = self.queued_urls.probe(absolute_url)
+                    if seen is None:
+                        uncertain.append((absolute_url, priority, fingerprint))
+                    elif seen or not self._mark_queued(absolute_url, fingerprint):
+                        duplicates += 1
+                    else:
+                        entries.append((priority, next_depth, absolute_url))
+                # 被禁止的URL只在第一次遇到时记录，之后其他页面再链接到它只计数
+                new_blocked = []
+                for absolute_url in blocked:
+                    if absolute_url not in self.robots_blocked_urls:
+                        self.robots_blocked_urls.add(absolute_url)
+                        new_blocked.append(absolute_url)
+                self.total_urls_discovered += len(entries)
+                self.robots_blocked_count += robots_blocked
+                self.cross_domain_blocked_count += cross_domain_blocked
+                self.depth_blocked_count += depth_blocked
+                self.duplicate_count += duplicates
+            
+            if uncertain:
+                # 布隆过滤器命中但不在LRU中的URL在锁外查数据库，再加锁标记确认未入队的URL
+                unseen = [item for item in uncertain if not self.queued_urls.verify(item[0])]
+                confirmed = 0
+                with self.queue_lock:
+                    for absolute_url, priority, fingerprint in unseen:
+                        # 确认期间其他线程可能已将其入队
+                        if self.queued_urls.probe(absolute_url) is True or not self._mark_queued(absolute_url, fingerprint):
+                            continue
+                        entries.append((priority, next_depth, absolute_url))
+                        confirmed += 1
+                    self.total_urls_discovered += confirmed
+                    self.duplicate_count += len(uncertain) - confirmed
+                duplicates += len(uncertain) - confirmed
+            new_urls = len(entries)
+            
+            # 保存被robots禁止的URL记录
+            for absolute_url in new_blocked:
+                logger.info(f"URL blocked by robots.txt: {absolute_url}")
+                rows.append(self._url_record_params(absolute_url, next_depth, 'robots_blocked', 0, 0, 0, '', None))
+            
+            # 保存待处理状态的URL记录
+            rows.extend(self._url_record_params(url, d, 'pending', 0, 0, 0, '', None)
+                        for _, d, url in entries)
+            
+            # 先提交pending记录再入队，保证记录的插入先于处理该URL时的更新
+            self._bulk_insert_url_records(rows)
+            if entries:
+                with self.queue_lock:
+                    for entry in entries:
+                        heapq.heappush(self.url_queue, entry)
+                # 新URL加入队列后立即提交给空闲线程
+                self._dispatch()
             
             total_links = new_urls + robots_blocked + cross_domain_blocked + depth_blocked + duplicates
             if total_links > 0:
@@ -1092,89 +2094,123 @@ class CrawlerThread(threading.Thread):
     def save_url_record(self, url: str, depth: int, status: str, status_code: int, 
                        response_time: float, file_size: int, content_type: str, 
                        error_message: str, metadata: dict = None):
-        """保存URL记录到数据库"""
+        """保存URL记录到数据库（交给写入线程批量执行）"""
         try:
-            # 关键修复：先规范化URL再保存，确保http和https统一
-            url = self.normalize_url(url)
-            
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            now = datetime.now().isoformat()
-            
-            # 提取元数据
-            title = metadata.get('title', '') if metadata else ''
-            author = metadata.get('author', '') if metadata else ''
-            description = metadata.get('description', '') if metadata else ''
-            keywords = metadata.get('keywords', '') if metadata else ''
-            publish_time = metadata.get('publish_time', '') if metadata else ''
-            
-            # 保存metadata为JSON字符串（排除content字段）
-            metadata_json = None
-            if metadata:
-                # 创建metadata副本，排除content字段
-                metadata_clean = {k: v for k, v in metadata.items() if k != 'content'}
-                metadata_json = json.dumps(metadata_clean) if metadata_clean else None
-            
-            # 使用INSERT OR REPLACE防止重复插入相同URL
-            cursor.execute('''
-                INSERT OR REPLACE INTO url_records 
-                (task_id, url, depth, status, status_code, response_time, file_size, 
-                 content_type, title, author, description, keywords, publish_time,
-                 error_message, metadata, created_at, completed_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (self.task_id, url, depth, status, status_code, response_time, 
-                  file_size, content_type, title, author, description, keywords, 
-                  publish_time, error_message, metadata_json, now, now))
-            
-            conn.commit()
-            conn.close()
+            self.write_q.put(('insert_url', [self._url_record_params(
+                url, depth, status, status_code, response_time, file_size, 
+                content_type, error_message, metadata)]))
         except Exception as e:
             logger.error(f"Failed to save URL record: {e}", exc_info=True)
     
-    def update_url_record(self, url: str, status: str, status_code: int, 
-                         response_time: float, file_size: int, content_type: str, 
-                         error_message: str, metadata: dict = None):
-        """更新URL记录状态"""
+    def _bulk_insert_url_records(self, rows: list):
+        """把一批URL记录作为一条写操作交给写入线程，由其executemany插入"""
+        if rows:
+            self.write_q.put(('insert_url', rows))
+    
+    def _url_record_params(self, url: str, depth: int, status: str, status_code: int, 
+                           response_time: float, file_size: int, content_type: str, 
+                           error_message: str, metadata: dict = None) -> tuple:
+        """生成WRITE_SQL['insert_url']的参数"""
+        # 关键修复：先规范化URL再保存，确保http和https统一
+        url = self.normalize_url(url)
+        
+        now = datetime.now().isoformat()
+        title, author, description, keywords, publish_time, metadata_json = self._metadata_columns(url, metadata)
+        
+        return (self.task_id, url, self._netloc_of(url), depth, status, status_code, response_time, 
+                file_size, content_type, title, author, description, keywords, 
+                publish_time, error_message, metadata_json, now, now)
+    
+    @staticmethod
+    def _metadata_columns(url: str, metadata: dict) -> tuple:
+        """从元数据中取出单独存储的各列，并把元数据（排除content字段）序列化为JSON，两种写入共用"""
+        if not metadata:
+            return '', '', '', '', '', None
+        
+        metadata_json = None
+        metadata_clean = {k: v for k, v in metadata.items() if k != 'content'}
+        if metadata_clean:
+            try:
+                # 有orjson时用其序列化，结果与json.dumps(ensure_ascii=False)等价
+                if orjson:
+                    metadata_json = orjson.dumps(metadata_clean).decode('utf-8')
+                else:
+                    metadata_json = json.dumps(metadata_clean, ensure_ascii=False)
+            except Exception as e:
+                logger.warning(f"Failed to serialize metadata for {url}: {e}")
+        
+        return (metadata.get('title', ''), metadata.get('author', ''), metadata.get('description', ''),
+                metadata.get('keywords', ''), metadata.get('publish_time', ''), metadata_json)
+    
+    def update_url_record(self, url: str, status: str, status_code: int, 
+                         response_time: float, file_size: int, content_type: str, 
+                         error_message: str, metadata: dict = None):
+        """更新URL记录状态（交给写入线程批量执行）"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
             now = datetime.now().isoformat()
+            title, author, description, keywords, publish_time, metadata_json = self._metadata_columns(url, metadata)
             
-            # 提取元数据
-            title = metadata.get('title', '') if metadata else ''
-            author = metadata.get('author', '') if metadata else ''
-            description = metadata.get('description', '') if metadata else ''
-            keywords = metadata.get('keywords', '') if metadata else ''
-            publish_time = metadata.get('publish_time', '') if metadata else ''
-            
-            # 序列化metadata（排除content字段）
-            metadata_json = None
-            if metadata:
-                try:
-                    # 创建metadata副本，排除content字段
-                    metadata_clean = {k: v for k, v in metadata.items() if k != 'content'}
-                    metadata_json = json.dumps(metadata_clean, ensure_ascii=False) if metadata_clean else None
-                except Exception as e:
-                    logger.warning(f"Failed to serialize metadata for {url}: {e}")
-            
-            cursor.execute('''
-                UPDATE url_records 
-                SET status = ?, status_code = ?, response_time = ?, file_size = ?, 
-                    content_type = ?, title = ?, author = ?, description = ?, 
-                    keywords = ?, publish_time = ?, error_message = ?, completed_at = ?,
-                    metadata = ?
-                WHERE task_id = ? AND url = ?
-            ''', (status, status_code, response_time, file_size, content_type, 
-                  title, author, description, keywords, publish_time, error_message, 
-                  now, metadata_json, self.task_id, url))
-            
-            conn.commit()
-            conn.close()
+            self.write_q.put(('update_url', [(
+                status, status_code, response_time, file_size, content_type, 
+                title, author, description, keywords, publish_time, error_message, 
+                now, metadata_json, self.task_id, url)]))
         except Exception as e:
             logger.error(f"Failed to update URL record: {e}", exc_info=True)
     
+    def _db_writer_loop(self):
+        """数据库写入线程：批量取出写操作，用executemany在一个事务中提交"""
+        conn = self.db.get_connection()
+        try:
+            while True:
+                op = self.write_q.get()
+                if op is None:
+                    break
+                
+                # 攒批：最多WRITE_BATCH_SIZE条，或等待WRITE_FLUSH_INTERVAL秒
+                batch = [op]
+                deadline = time.monotonic() + self.WRITE_FLUSH_INTERVAL
+                stopping = False
+                while len(batch) < self.WRITE_BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        op = self.write_q.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if op is None:
+                        stopping = True
+                        break
+                    batch.append(op)
+                
+                self._flush_writes(conn, batch)
+                if stopping:
+                    break
+        finally:
+            conn.close()
+    
+    def _flush_writes(self, conn, batch):
+        """在一个事务中执行一批写操作，相邻的同类操作合并为一次executemany
+
+        每个写操作为(操作类型, 参数列表)，参数列表可包含多行（如整页发现的链接）。
+        """
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            # 按原顺序分组，保证同一URL的插入先于更新
+            for op_type, group in itertools.groupby(batch, key=lambda op: op[0]):
+                cursor.executemany(self.WRITE_SQL[op_type], [params for _, rows in group for params in rows])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Task {self.task_id}: Failed to write {len(batch)} URL records: {e}", exc_info=True)
+    
+    def _stop_writer(self):
+        """通知写入线程写完剩余记录后退出，并等待其结束"""
+        if self._writer.is_alive():
+            self.write_q.put(None)
+            self._writer.join(timeout=30)
+    
     def update_progress(self):
         """更新任务进度"""
         try:
@@ -1182,7 +2218,7 @@ class CrawlerThread(threading.Thread):
                 # 进度 = 已处理URL数量 / 发现的URL总数
                 total_discovered = self.total_urls_discovered
                 total_processed = self.total_urls_processed
-                queue_size = self.url_queue.qsize()
+                queue_size = len(self.url_queue)
                 
                 # 计算真实进度：只有全部处理完才是100%
                 if total_discovered > 0:
@@ -1195,49 +2231,55 @@ class CrawlerThread(threading.Thread):
                 
                 # 成功率 = 成功数量 / 已处理数量
                 success_rate = (self.completed_count / max(total_processed, 1)) * 100 if total_processed > 0 else 0.0
-                avg_response_time = sum(self.response_times[-100:]) / len(self.response_times[-100:]) if self.response_times else 0
+                avg_response_time = self.avg_response_time()
+                size_buckets = json.dumps(self.size_histogram)
+                time_buckets = json.dumps(self.time_histogram)
             
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
-            # 确保只更新当前任务的数据
-            cursor.execute('''
-                UPDATE tasks 
-                SET progress = ?, total_urls = ?, completed_urls = ?, failed_urls = ?,
-                    success_rate = ?, total_bytes = ?, avg_response_time = ?
-                WHERE id = ?
-            ''', (progress, self.total_urls_discovered, self.completed_count, self.failed_count,
-                  success_rate, self.total_bytes, avg_response_time, self.task_id))
+            # 复用线程连接；with块结束时提交，异常时回滚，不会留下未结束的事务
+            conn = self.db.get_thread_connection()
+            with conn:
+                cursor = conn.cursor()
+                
+                # 确保只更新当前任务的数据
+                cursor.execute('''
+                    UPDATE tasks 
+                    SET progress = ?, total_urls = ?, completed_urls = ?, failed_urls = ?,
+                        success_rate = ?, total_bytes = ?, avg_response_time = ?
+                    WHERE id = ?
+                ''', (progress, self.total_urls_discovered, self.completed_count, self.failed_count,
+                      success_rate, self.total_bytes, avg_response_time, self.task_id))
+                update_count = cursor.rowcount
+                
+                cursor.execute('''
+                    INSERT INTO task_histograms (task_id, size_buckets, time_buckets) VALUES (?, ?, ?)
+                    ON CONFLICT(task_id) DO UPDATE SET
+                        size_buckets = excluded.size_buckets, time_buckets = excluded.time_buckets
+                ''', (self.task_id, size_buckets, time_buckets))
             
             # 验证更新是否成功
-            if cursor.rowcount != 1:
-                logger.warning(f"Task {self.task_id}: Expected to update 1 row, but updated {cursor.rowcount} rows")
+            if update_count != 1:
+                logger.warning(f"Task {self.task_id}: Expected to update 1 row, but updated {update_count} rows")
             else:
-                logger.debug(f"Task {self.task_id}: Progress updated - completed={self.completed_count}, bytes={self.total_bytes}")
-            
-            conn.commit()
-            conn.close()
+                logger.debug("Task %s: Progress updated - completed=%s, bytes=%s", self.task_id, self.completed_count, self.total_bytes)
         except Exception as e:
             logger.error(f"Failed to update progress: {e}", exc_info=True)
     
     def update_task_status(self, status: str):
-        """更新任务状态"""
+        """更新任务状态
+
+        pause()/resume()在Werkzeug的请求线程中调用，每个请求一个新线程，不能使用线程连接，
+        这里一律通过连接池的execute_write写入（数据库忙时自动重试）。
+        """
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            
             now = datetime.now().isoformat()
             if status == 'running':
-                cursor.execute('UPDATE tasks SET status = ?, started_at = ? WHERE id = ?', 
-                             (status, now, self.task_id))
+                self.db.execute_write('UPDATE tasks SET status = ?, started_at = ? WHERE id = ?', 
+                                      (status, now, self.task_id))
             elif status in ['completed', 'stopped', 'failed']:
-                cursor.execute('UPDATE tasks SET status = ?, finished_at = ? WHERE id = ?', 
-                             (status, now, self.task_id))
+                self.db.execute_write('UPDATE tasks SET status = ?, finished_at = ? WHERE id = ?', 
+                                      (status, now, self.task_id))
             else:
-                cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', (status, self.task_id))
-            
-            conn.commit()
-            conn.close()
+                self.db.execute_write('UPDATE tasks SET status = ? WHERE id = ?', (status, self.task_id))
             self.status = status
             
             # 推送任务状态更新
@@ -1251,55 +2293,65 @@ class CrawlerThread(threading.Thread):
         except Exception as e:
             logger.error(f"Failed to update task status: {e}", exc_info=True)
     
+    def monitor_snapshot(self) -> dict:
+        """组装当前的监控数据，WebSocket推送和监控接口共用"""
+        # 不获取queue_lock：读取单个整数和len()在GIL下都是原子的，监控请求不会阻塞工作线程。
+        # 各字段不是同一时刻的快照，先读已处理数再读发现数，保证已处理数不超过发现数
+        total_processed = self.total_urls_processed    # 已处理的URL数量
+        total_discovered = self.total_urls_discovered  # 加入队列的URL总数
+        queue_size = len(self.url_queue)               # 队列中剩余的URL数量
+        completed_count = self.completed_count
+        failed_count = self.failed_count
+        cross_domain_blocked = self.cross_domain_blocked_count
+        depth_blocked = self.depth_blocked_count
+        duplicates = self.duplicate_count
+        avg_response_time = self.avg_response_time()
+        
+        # 进度 = 已处理 / 总发现 * 100%
+        if total_discovered > 0:
+            progress = (total_processed / total_discovered) * 100
+            # 避免四舍五入导致99.66%显示为100%
+            if progress >= 99.95 and total_processed < total_discovered:
+                progress = 99.9
+        else:
+            progress = 0.0
+        
+        # 调试信息
+        logger.debug("Progress calculation: %s/%s = %.1f%%, queue_size=%s", total_processed, total_discovered, progress, queue_size)
+        
+        success_rate = (completed_count / max(total_processed, 1)) * 100 if total_processed > 0 else 0.0
+        
+        return {
+            'task_id': self.task_id,
+            'status': self.status,
+            'queue_status': 'paused' if self.queue_paused else 'active',
+            'progress': progress,
+            'total_urls': total_discovered,  # 发现并加入队列的URL数量
+            'total_processed': total_processed,  # 已处理的URL数量
+            'completed_urls': completed_count,
+            'failed_urls': failed_count,
+            'cross_domain_blocked_urls': cross_domain_blocked,
+            'depth_blocked_urls': depth_blocked,
+            'duplicate_urls': duplicates,
+            'queue_size': queue_size,
+            'success_rate': success_rate,
+            'total_bytes': self.total_bytes,
+            'avg_response_time': avg_response_time,
+            'threads': self.thread_stats
+        }
+    
     def send_monitor_data(self, force=False):
         """发送监控数据到前端"""
         try:
             # 控制发送频率，避免过于频繁的SocketIO操作
-            current_time = time.time()
-            if not force and current_time - self.last_monitor_send < 1.0:  # 最少间隔1秒
+            current_time = time.monotonic()
+            if not force and current_time - self.last_monitor_send < self.MONITOR_PUSH_INTERVAL:
                 return
             self.last_monitor_send = current_time
-            with self.queue_lock:
-                # 计算进度
-                total_discovered = self.total_urls_discovered  # 加入队列的URL总数
-                total_processed = self.total_urls_processed    # 已处理的URL数量
-                queue_size = self.url_queue.qsize()           # 队列中剩余的URL数量
-                
-                # 进度 = 已处理 / 总发现 * 100%
-                if total_discovered > 0:
-                    progress = (total_processed / total_discovered) * 100
-                    # 避免四舍五入导致99.66%显示为100%
-                    if progress >= 99.95 and total_processed < total_discovered:
-                        progress = 99.9
-                else:
-                    progress = 0.0
-                
-                # 调试信息
-                logger.info(f"Progress calculation: {total_processed}/{total_discovered} = {progress:.1f}%, queue_size={queue_size}")
-                
-                success_rate = (self.completed_count / max(total_processed, 1)) * 100 if total_processed > 0 else 0.0
-                
-                monitor_data = {
-                    'task_id': self.task_id,
-                    'status': self.status,
-                    'progress': progress,
-                    'total_urls': total_discovered,  # 发现并加入队列的URL数量
-                    'total_processed': total_processed,  # 已处理的URL数量
-                    'completed_urls': self.completed_count,
-                    'failed_urls': self.failed_count,
-                    'cross_domain_blocked_urls': self.cross_domain_blocked_count,
-                    'depth_blocked_urls': self.depth_blocked_count,
-                    'duplicate_urls': self.duplicate_count,
-                    'queue_size': queue_size,
-                    'success_rate': success_rate,
-                    'total_bytes': self.total_bytes,
-                    'avg_response_time': sum(self.response_times[-100:]) / len(self.response_times[-100:]) if self.response_times else 0,
-                    'threads': self.thread_stats
-                }
             
             # 通过WebSocket推送监控数据
             if socketio:
-                broadcast_monitor_data(self.task_id, monitor_data)
+                broadcast_monitor_data(self.task_id, self.monitor_snapshot())
         except Exception as e:
             logger.error(f"Failed to send monitor data: {e}", exc_info=True)
     
@@ -1311,13 +2363,22 @@ class CrawlerThread(threading.Thread):
     def pause(self):
         """暂停爬虫"""
         self.paused = True
+        for stat in self.thread_stats.values():
+            if stat['status'] == 'idle':
+                stat['status'] = 'paused'
+        self._dirty.set()
         self.update_task_status('paused')
         logger.info(f"Task {self.task_id} paused")
     
     def resume(self):
         """继续爬虫"""
         self.paused = False
+        for stat in self.thread_stats.values():
+            if stat['status'] == 'paused':
+                stat['status'] = 'idle'
+        self._dirty.set()
         self.update_task_status('running')
+        self._dispatch()
         logger.info(f"Task {self.task_id} resumed")
     
     def pause_queue(self):
@@ -1333,13 +2394,9 @@ class CrawlerThread(threading.Thread):
         logger.info(f"Task {self.task_id} queue resumed - URL discovery enabled")
     
     def _update_queue_status(self, status):
-        """更新数据库中的队列状态"""
+        """更新数据库中的队列状态（在请求线程中调用，使用连接池）"""
         try:
-            conn = self.db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('UPDATE tasks SET queue_status = ? WHERE id = ?', (status, self.task_id))
-            conn.commit()
-            conn.close()
+            self.db.execute_write('UPDATE tasks SET queue_status = ? WHERE id = ?', (status, self.task_id))
             logger.debug(f"Task {self.task_id} queue status updated to: {status}")
         except Exception as e:
             logger.error(f"Failed to update queue status: {e}", exc_info=True)
@@ -1353,6 +2410,78 @@ class CrawlerThread(threading.Thread):
         logger.info(f"Task {self.task_id} stopped manually")
 
 
+def raise_open_file_limit():
+    """把可打开文件数的软限制提高到硬限制
+
+    每个WebSocket连接、爬虫HTTP连接和数据库连接都占用文件描述符，默认的1024软限制容易用尽。
+    提高硬限制需要root权限，这里只调整软限制；Windows上没有resource模块，直接跳过。
+    """
+    if resource is None:
+        return
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        # 硬限制为无限时部分系统不允许把软限制设为无限，取一个足够大的值
+        target = hard if hard != resource.RLIM_INFINITY else 1048576
+        if soft != resource.RLIM_INFINITY and soft < target:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            logger.info(f"Raised open file limit from {soft} to {target}")
+    except (ValueError, OSError) as e:
+        logger.warning(f"Failed to raise open file limit: {e}")
+
+
+# HTML解析进程池：解析是CPU密集型工作，放到子进程中执行以避开GIL，工作线程只负责网络I/O
+# 只在支持fork的平台启用：spawn方式的子进程会重新导入本模块并重复初始化数据库
+parse_pool: Optional[ProcessPoolExecutor] = None
+parse_pool_lock = threading.Lock()
+
+def parse_html(html: bytes, links_only: bool = False) -> tuple:
+    """解析HTML，返回(元数据, 候选链接集合)；在子进程中执行，参数和返回值只包含基本类型
+
+    links_only为True时不提取元数据，返回空字典。
+    """
+    doc = CrawlerThread._parse_html(html)
+    # 元数据标签和<a>/<img>/<link>/<script>链接在同一次遍历中取出
+    nodes, links = CrawlerThread._select_page_nodes(doc)
+    links.update(CrawlerThread.extract_text_urls(html))
+    if links_only:
+        return {}, links
+    return CrawlerThread.extract_metadata(doc, nodes), links
+
+def init_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """创建HTML解析进程池，平台不支持fork时返回None
+
+    只在主程序启动时、进程中还没有其他线程时调用一次，fork出的子进程才不会继承其他线程持有的
+    日志、requests或sqlite3锁；之后不再重新创建。
+    """
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None and 'fork' in multiprocessing.get_all_start_methods():
+            parse_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context('fork')
+            )
+            # 提交一个空任务，让所有子进程立即创建
+            parse_pool.submit(int).result()
+        return parse_pool
+
+def parse_html_in_pool(html: bytes, links_only: bool = False) -> tuple:
+    """在解析进程池中解析HTML，进程池不可用时在当前线程中解析"""
+    global parse_pool
+    pool = parse_pool
+    if pool is None:
+        return parse_html(html, links_only)
+    try:
+        return pool.submit(parse_html, html, links_only).result()
+    except RuntimeError as e:
+        # 子进程异常退出（BrokenProcessPool）或进程池已关闭；解析本身的异常照常抛出
+        logger.warning(f"Parse pool unavailable, parsing in thread: {e}")
+        with parse_pool_lock:
+            if parse_pool is pool:
+                # 此时已有其他线程在运行，不能再fork新的进程池，之后一律在线程中解析
+                parse_pool = None
+        return parse_html(html, links_only)
+
+
 # ==================== API路由 ====================
 
 db = Database()
@@ -1360,34 +2489,35 @@ db = Database()
 def reset_task_data(task_id: int, clear_history: bool = True):
     """重置任务数据，用于重新启动已完成的任务"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        # 重置任务统计数据
-        cursor.execute('''
-            UPDATE tasks 
-            SET status = 'pending',
-                progress = 0.0,
-                total_urls = 0,
-                completed_urls = 0,
-                failed_urls = 0,
-                success_rate = 0.0,
-                total_bytes = 0,
-                avg_response_time = 0.0,
-                started_at = NULL,
-                finished_at = NULL
-            WHERE id = ?
-        ''', (task_id,))
-        
-        # 可选择是否删除之前的URL记录
-        if clear_history:
-            cursor.execute('DELETE FROM url_records WHERE task_id = ?', (task_id,))
-            logger.info(f"Reset task data and cleared history for task {task_id}")
-        else:
-            logger.info(f"Reset task data but kept history for task {task_id}")
+            # 重置任务统计数据
+            cursor.execute('''
+                UPDATE tasks 
+                SET status = 'pending',
+                    progress = 0.0,
+                    total_urls = 0,
+                    completed_urls = 0,
+                    failed_urls = 0,
+                    success_rate = 0.0,
+                    total_bytes = 0,
+                    avg_response_time = 0.0,
+                    started_at = NULL,
+                    finished_at = NULL
+                WHERE id = ?
+            ''', (task_id,))
         
-        conn.commit()
-        conn.close()
+            # 可选择是否删除之前的URL记录
+            if clear_history:
+                cursor.execute('DELETE FROM url_records WHERE task_id = ?', (task_id,))
+                cursor.execute('DELETE FROM task_histograms WHERE task_id = ?', (task_id,))
+                logger.info(f"Reset task data and cleared history for task {task_id}")
+            else:
+                logger.info(f"Reset task data but kept history for task {task_id}")
+        
+            conn.commit()
+            invalidate_stats_cache(task_id)
         
     except Exception as e:
         logger.error(f"Failed to reset task data: {e}", exc_info=True)
@@ -1426,11 +2556,10 @@ def static_files(path):
 def get_tasks():
     """获取所有任务"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks ORDER BY created_at DESC')
-        tasks = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM tasks ORDER BY created_at DESC')
+            tasks = [dict(row) for row in cursor.fetchall()]
         return jsonify({'success': True, 'data': tasks})
     except Exception as e:
         logger.error(f"Failed to get tasks: {e}", exc_info=True)
@@ -1447,32 +2576,34 @@ def create_task():
         if not data.get('name') or not data.get('url'):
             return jsonify({'success': False, 'error': 'Name and URL are required'}), 400
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        now = datetime.now().isoformat()
-        cursor.execute('''
-            INSERT INTO tasks 
-            (name, url, strategy, max_depth, thread_count, request_interval, 
-             retry_times, respect_robots, allow_cross_domain, status, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            data['name'],
-            data['url'],
-            data.get('strategy', 'bfs'),
-            data.get('max_depth', 3),
-            data.get('thread_count', 3),
-            data.get('request_interval', 1.0),
-            data.get('retry_times', 3),
-            data.get('respect_robots', True),
-            data.get('allow_cross_domain', False),
-            'pending',
-            now
-        ))
-        
-        task_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+            now = datetime.now().isoformat()
+            cursor.execute('''
+                INSERT INTO tasks 
+                (name, url, strategy, max_depth, thread_count, request_interval, 
+                 retry_times, respect_robots, allow_cross_domain, collapse_url_variants, skip_duplicate_content,
+                 status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                data['name'],
+                data['url'],
+                data.get('strategy', 'bfs'),
+                data.get('max_depth', 3),
+                data.get('thread_count', 3),
+                data.get('request_interval', 1.0),
+                data.get('retry_times', 3),
+                data.get('respect_robots', True),
+                data.get('allow_cross_domain', False),
+                data.get('collapse_url_variants', False),
+                data.get('skip_duplicate_content', False),
+                'pending',
+                now
+            ))
+        
+            task_id = cursor.lastrowid
+            conn.commit()
         
         logger.info(f"Created task {task_id}: {data['name']}")
         return jsonify({'success': True, 'data': {'id': task_id}})
@@ -1486,11 +2617,10 @@ def create_task():
 def get_task(task_id):
     """获取单个任务"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        conn.close()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+            task = cursor.fetchone()
         
         if task:
             return jsonify({'success': True, 'data': dict(task)})
@@ -1510,44 +2640,44 @@ def update_task(task_id):
         logger.info(f"Updating task {task_id} with data: {data}")
         
         # 检查任务是否正在运行
-        with crawler_lock:
-            if task_id in active_crawlers:
-                logger.warning(f"Attempt to update running task {task_id}. Active crawlers: {list(active_crawlers.keys())}")
-                return jsonify({'success': False, 'error': '任务正在运行中，请先停止任务再修改配置'}), 400
-            else:
-                logger.info(f"Task {task_id} not in active crawlers. Active: {list(active_crawlers.keys())}")
+        if task_id in active_crawlers:
+            logger.warning(f"Attempt to update running task {task_id}. Active crawlers: {list(active_crawlers.keys())}")
+            return jsonify({'success': False, 'error': '任务正在运行中，请先停止任务再修改配置'}), 400
+        else:
+            logger.info(f"Task {task_id} not in active crawlers. Active: {list(active_crawlers.keys())}")
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        # 检查任务是否存在
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        if not task:
-            conn.close()
-            return jsonify({'success': False, 'error': 'Task not found'}), 404
+            # 检查任务是否存在
+            cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+            task = cursor.fetchone()
+            if not task:
+                return jsonify({'success': False, 'error': 'Task not found'}), 404
         
-        # 更新任务
-        cursor.execute('''
-            UPDATE tasks 
-            SET name = ?, url = ?, strategy = ?, max_depth = ?, thread_count = ?,
-                request_interval = ?, retry_times = ?, respect_robots = ?, allow_cross_domain = ?
-            WHERE id = ?
-        ''', (
-            data.get('name', task['name']),
-            data.get('url', task['url']),
-            data.get('strategy', task['strategy']),
-            data.get('max_depth', task['max_depth']),
-            data.get('thread_count', task['thread_count']),
-            data.get('request_interval', task['request_interval']),
-            data.get('retry_times', task['retry_times']),
-            data.get('respect_robots', task['respect_robots']),
-            data.get('allow_cross_domain', task['allow_cross_domain']),
-            task_id
-        ))
+            # 更新任务
+            cursor.execute('''
+                UPDATE tasks 
+                SET name = ?, url = ?, strategy = ?, max_depth = ?, thread_count = ?,
+                    request_interval = ?, retry_times = ?, respect_robots = ?, allow_cross_domain = ?,
+                    collapse_url_variants = ?, skip_duplicate_content = ?
+                WHERE id = ?
+            ''', (
+                data.get('name', task['name']),
+                data.get('url', task['url']),
+                data.get('strategy', task['strategy']),
+                data.get('max_depth', task['max_depth']),
+                data.get('thread_count', task['thread_count']),
+                data.get('request_interval', task['request_interval']),
+                data.get('retry_times', task['retry_times']),
+                data.get('respect_robots', task['respect_robots']),
+                data.get('allow_cross_domain', task['allow_cross_domain']),
+                data.get('collapse_url_variants', task['collapse_url_variants']),
+                data.get('skip_duplicate_content', task['skip_duplicate_content']),
+                task_id
+            ))
         
-        conn.commit()
-        conn.close()
+            conn.commit()
         
         logger.info(f"Updated task {task_id}: {data.get('name')}")
         return jsonify({'success': True})
@@ -1567,12 +2697,15 @@ def delete_task(task_id):
                 active_crawlers[task_id].stop()
                 del active_crawlers[task_id]
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-        cursor.execute('DELETE FROM url_records WHERE task_id = ?', (task_id,))
-        conn.commit()
-        conn.close()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+            cursor.execute('DELETE FROM url_records WHERE task_id = ?', (task_id,))
+            cursor.execute('DELETE FROM task_histograms WHERE task_id = ?', (task_id,))
+            conn.commit()
+        invalidate_stats_cache(task_id)
+        # 已删除的任务不会再有推送，移出其房间的所有客户端；客户端断开时SocketIO会自动清理其所在房间
+        socketio.close_room(task_room(task_id))
         
         logger.info(f"Deleted task {task_id}")
         return jsonify({'success': True})
@@ -1592,11 +2725,10 @@ def start_task(task_id):
                 return jsonify({'success': False, 'error': 'Task is already running'}), 400
         
         # 获取任务配置
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        conn.close()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+            task = cursor.fetchone()
         
         if not task:
             return jsonify({'success': False, 'error': 'Task not found'}), 404
@@ -1609,11 +2741,7 @@ def start_task(task_id):
             reset_task_data(task_id)
         
         # 启动任务时，总是将队列状态设为active
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE tasks SET queue_status = ? WHERE id = ?', ('active', task_id))
-        conn.commit()
-        conn.close()
+        db.execute_write('UPDATE tasks SET queue_status = ? WHERE id = ?', ('active', task_id))
         logger.info(f"Task {task_id} queue status set to active")
         
         # 创建并启动爬虫
@@ -1640,19 +2768,14 @@ def start_task(task_id):
 def pause_task(task_id):
     """暂停任务"""
     try:
-        with crawler_lock:
-            if task_id not in active_crawlers:
-                # 任务不在运行中，直接更新数据库状态
-                logger.info(f"Task {task_id} not in active crawlers, updating database status to paused")
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', ('paused', task_id))
-                conn.commit()
-                conn.close()
-                return jsonify({'success': True})
-            
-            active_crawlers[task_id].pause()
+        crawler = active_crawlers.get(task_id)
+        if crawler is None:
+            # 任务不在运行中，直接更新数据库状态
+            logger.info(f"Task {task_id} not in active crawlers, updating database status to paused")
+            db.execute_write('UPDATE tasks SET status = ? WHERE id = ?', ('paused', task_id))
+            return jsonify({'success': True})
         
+        crawler.pause()
         return jsonify({'success': True})
     
     except Exception as e:
@@ -1664,30 +2787,26 @@ def pause_task(task_id):
 def resume_task(task_id):
     """继续任务"""
     try:
+        # 运行中（暂停）的任务直接继续，不需要持有crawler_lock
+        crawler = active_crawlers.get(task_id)
+        if crawler is not None:
+            crawler.resume()
+            return jsonify({'success': True})
+        
+        # 重新启动爬虫需要在锁内检查并加入活跃列表，防止重复启动
         with crawler_lock:
             if task_id not in active_crawlers:
-                # 任务不在运行中，检查是否是暂停状态，如果是则重新启动
-                conn = db.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT status FROM tasks WHERE id = ?', (task_id,))
-                task = cursor.fetchone()
-                conn.close()
+                # 任务不在运行中，检查是否是暂停状态，如果是则重新启动（一次查询同时取状态和配置）
+                with db.borrow() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+                    task = cursor.fetchone()
                 
                 if task and task['status'] in ['paused', 'completed', 'stopped', 'failed']:
                     # 非运行状态的任务，重新启动
                     logger.info(f"Task {task_id} status is {task['status']}, restarting crawler")
                     
-                    # 获取任务配置并重新启动
-                    conn = db.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-                    task_data = cursor.fetchone()
-                    conn.close()
-                    
-                    if not task_data:
-                        return jsonify({'success': False, 'error': 'Task not found'}), 404
-                    
-                    task_config = dict(task_data)
+                    task_config = dict(task)
                     
                     # 如果任务已完成或停止，重置任务数据
                     if task['status'] in ['completed', 'stopped', 'failed']:
@@ -1704,11 +2823,7 @@ def resume_task(task_id):
                         active_crawlers[task_id] = crawler
                         
                         # 更新任务状态为运行中，并恢复队列状态
-                        conn = db.get_connection()
-                        cursor = conn.cursor()
-                        cursor.execute('UPDATE tasks SET status = ?, queue_status = ? WHERE id = ?', ('running', 'active', task_id))
-                        conn.commit()
-                        conn.close()
+                        db.execute_write('UPDATE tasks SET status = ?, queue_status = ? WHERE id = ?', ('running', 'active', task_id))
                         
                         logger.info(f"Task {task_id} resumed successfully")
                         return jsonify({'success': True})
@@ -1735,27 +2850,16 @@ def pause_task_queue(task_id):
     try:
         logger.info(f"Attempting to pause queue for task {task_id}")
         
-        # 直接更新数据库中的队列状态
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 检查任务是否存在
-        cursor.execute('SELECT id, status FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        if not task:
-            conn.close()
+        # 直接更新数据库中的队列状态，没有更新到任何行说明任务不存在
+        updated = db.execute_write('UPDATE tasks SET queue_status = ? WHERE id = ?', ('paused', task_id))
+        if not updated:
             return jsonify({'success': False, 'error': '任务不存在'}), 404
         
-        # 更新队列状态
-        cursor.execute('UPDATE tasks SET queue_status = ? WHERE id = ?', ('paused', task_id))
-        conn.commit()
-        conn.close()
-        
         # 如果任务正在运行，也更新运行时状态
-        with crawler_lock:
-            if task_id in active_crawlers:
-                active_crawlers[task_id].queue_paused = True
-                logger.info(f"Updated running crawler queue status for task {task_id}")
+        crawler = active_crawlers.get(task_id)
+        if crawler is not None:
+            crawler.queue_paused = True
+            logger.info(f"Updated running crawler queue status for task {task_id}")
         
         logger.info(f"Successfully paused queue for task {task_id}")
         return jsonify({'success': True})
@@ -1771,27 +2875,16 @@ def resume_task_queue(task_id):
     try:
         logger.info(f"Attempting to resume queue for task {task_id}")
         
-        # 直接更新数据库中的队列状态
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        
-        # 检查任务是否存在
-        cursor.execute('SELECT id, status FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        if not task:
-            conn.close()
+        # 直接更新数据库中的队列状态，没有更新到任何行说明任务不存在
+        updated = db.execute_write('UPDATE tasks SET queue_status = ? WHERE id = ?', ('active', task_id))
+        if not updated:
             return jsonify({'success': False, 'error': '任务不存在'}), 404
         
-        # 更新队列状态
-        cursor.execute('UPDATE tasks SET queue_status = ? WHERE id = ?', ('active', task_id))
-        conn.commit()
-        conn.close()
-        
         # 如果任务正在运行，也更新运行时状态
-        with crawler_lock:
-            if task_id in active_crawlers:
-                active_crawlers[task_id].queue_paused = False
-                logger.info(f"Updated running crawler queue status for task {task_id}")
+        crawler = active_crawlers.get(task_id)
+        if crawler is not None:
+            crawler.queue_paused = False
+            logger.info(f"Updated running crawler queue status for task {task_id}")
         
         logger.info(f"Successfully resumed queue for task {task_id}")
         return jsonify({'success': True})
@@ -1817,11 +2910,7 @@ def stop_task(task_id):
                 logger.info(f"Task {task_id} not in active crawlers, updating database status")
         
         # 无论如何都更新数据库状态
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('UPDATE tasks SET status = ? WHERE id = ?', ('stopped', task_id))
-        conn.commit()
-        conn.close()
+        db.execute_write('UPDATE tasks SET status = ? WHERE id = ?', ('stopped', task_id))
         
         return jsonify({'success': True})
     
@@ -1835,102 +2924,69 @@ def get_monitor_data(task_id):
     """获取任务监控数据"""
     try:
         logger.debug(f"Getting monitor data for task {task_id}")
-        with crawler_lock:
-            if task_id in active_crawlers:
-                crawler = active_crawlers[task_id]
-                with crawler.queue_lock:
-                    total_processed = crawler.completed_count + crawler.failed_count
-                    success_rate = (crawler.completed_count / max(total_processed, 1)) * 100 if total_processed > 0 else 0.0
-                    if crawler.total_urls_discovered > 0:
-                        progress = (total_processed / crawler.total_urls_discovered) * 100
-                        # 避免误导性的100%显示
-                        if progress >= 99.95 and total_processed < crawler.total_urls_discovered:
-                            progress = 99.9
-                    else:
-                        progress = 0.0
-                    
-                    monitor_data = {
-                        'task_id': task_id,
-                        'status': crawler.status,
-                        'queue_status': 'paused' if crawler.queue_paused else 'active',
-                        'progress': progress,
-                        'total_urls': crawler.total_urls_discovered,
-                        'completed_urls': crawler.completed_count,
-                        'failed_urls': crawler.failed_count,
-                        'queue_size': crawler.url_queue.qsize(),
-                        'success_rate': success_rate,
-                        'total_bytes': crawler.total_bytes,
-                        'avg_response_time': sum(crawler.response_times[-100:]) / len(crawler.response_times[-100:]) if crawler.response_times else 0,
-                        'cross_domain_blocked_urls': crawler.cross_domain_blocked_count,
-                        'depth_blocked_urls': crawler.depth_blocked_count,
-                        'duplicate_urls': crawler.duplicate_count,
-                        'threads': crawler.thread_stats
-                    }
-                    
-                    logger.debug(f"Active task {task_id} monitor data: completed={crawler.completed_count}, bytes={crawler.total_bytes}")
-                return jsonify({'success': True, 'data': monitor_data})
+        # 运行中的任务由爬虫线程通过WebSocket推送，这里只为首次打开页面等场景提供一次性的快照
+        crawler = active_crawlers.get(task_id)
+        if crawler:
+            return jsonify({'success': True, 'data': crawler.monitor_snapshot()})
         
         # 如果爬虫不在运行，从数据库获取
-        conn = db.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
-        task = cursor.fetchone()
-        
-        if task:
-            task_dict = dict(task)
-            
-            # 从URL记录中计算实际的流量统计
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as total_records,
-                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_count,
-                    SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_count,
-                    SUM(CASE WHEN status = 'completed' THEN COALESCE(file_size, 0) ELSE 0 END) as actual_total_bytes,
-                    AVG(CASE WHEN status = 'completed' AND response_time > 0 THEN response_time ELSE NULL END) as actual_avg_response
-                FROM url_records 
-                WHERE task_id = ?
-            ''', (task_id,))
-            
-            stats = cursor.fetchone()
-            
-            # 如果没有URL记录，使用tasks表中的数据作为备选
-            if stats and stats['total_records'] > 0:
-                # 使用实际统计数据
-                actual_completed = stats['completed_count'] or 0
-                actual_failed = stats['failed_count'] or 0
-                actual_total_bytes = stats['actual_total_bytes'] or 0
-                actual_avg_response = stats['actual_avg_response'] or 0
-                logger.debug(f"Task {task_id}: Using URL records stats - completed={actual_completed}, bytes={actual_total_bytes}")
-            else:
-                # 没有URL记录，使用tasks表数据
-                actual_completed = task_dict['completed_urls'] or 0
-                actual_failed = task_dict['failed_urls'] or 0
-                actual_total_bytes = task_dict['total_bytes'] or 0
-                actual_avg_response = task_dict['avg_response_time'] or 0
-                logger.debug(f"Task {task_id}: No URL records, using tasks table stats - completed={actual_completed}, bytes={actual_total_bytes}")
-            
-            conn.close()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM tasks WHERE id = ?', (task_id,))
+            task = cursor.fetchone()
+        
+            if task:
+                task_dict = dict(task)
+            
+                # 从URL记录中计算实际的流量统计
+                cursor.execute('''
+                    SELECT 
+                        COUNT(*) as total_records,
+                        SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_count,
+                        SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_count,
+                        SUM(CASE WHEN status = 'completed' THEN COALESCE(file_size, 0) ELSE 0 END) as actual_total_bytes,
+                        AVG(CASE WHEN status = 'completed' AND response_time > 0 THEN response_time ELSE NULL END) as actual_avg_response
+                    FROM url_records 
+                    WHERE task_id = ?
+                ''', (task_id,))
+            
+                stats = cursor.fetchone()
+            
+                # 如果没有URL记录，使用tasks表中的数据作为备选
+                if stats and stats['total_records'] > 0:
+                    # 使用实际统计数据
+                    actual_completed = stats['completed_count'] or 0
+                    actual_failed = stats['failed_count'] or 0
+                    actual_total_bytes = stats['actual_total_bytes'] or 0
+                    actual_avg_response = stats['actual_avg_response'] or 0
+                    logger.debug(f"Task {task_id}: Using URL records stats - completed={actual_completed}, bytes={actual_total_bytes}")
+                else:
+                    # 没有URL记录，使用tasks表数据
+                    actual_completed = task_dict['completed_urls'] or 0
+                    actual_failed = task_dict['failed_urls'] or 0
+                    actual_total_bytes = task_dict['total_bytes'] or 0
+                    actual_avg_response = task_dict['avg_response_time'] or 0
+                    logger.debug(f"Task {task_id}: No URL records, using tasks table stats - completed={actual_completed}, bytes={actual_total_bytes}")
+                
+                actual_total_processed = actual_completed + actual_failed
+                actual_success_rate = (actual_completed / max(actual_total_processed, 1)) * 100 if actual_total_processed > 0 else 0.0
             
-            actual_total_processed = actual_completed + actual_failed
-            actual_success_rate = (actual_completed / max(actual_total_processed, 1)) * 100 if actual_total_processed > 0 else 0.0
-            
-            monitor_data = {
-                'task_id': task_id,
-                'status': task_dict['status'],
-                'queue_status': task_dict.get('queue_status', 'active'),
-                'progress': task_dict['progress'],
-                'total_urls': task_dict['total_urls'],
-                'completed_urls': actual_completed,
-                'failed_urls': actual_failed,
-                'queue_size': 0,
-                'success_rate': actual_success_rate,
-                'total_bytes': actual_total_bytes,  # 使用计算后的流量数据
-                'avg_response_time': actual_avg_response,
-                'threads': {}
-            }
-            return jsonify({'success': True, 'data': monitor_data})
+                monitor_data = {
+                    'task_id': task_id,
+                    'status': task_dict['status'],
+                    'queue_status': task_dict.get('queue_status', 'active'),
+                    'progress': task_dict['progress'],
+                    'total_urls': task_dict['total_urls'],
+                    'completed_urls': actual_completed,
+                    'failed_urls': actual_failed,
+                    'queue_size': 0,
+                    'success_rate': actual_success_rate,
+                    'total_bytes': actual_total_bytes,  # 使用计算后的流量数据
+                    'avg_response_time': actual_avg_response,
+                    'threads': {}
+                }
+                return jsonify({'success': True, 'data': monitor_data})
         
-        conn.close()
         
         return jsonify({'success': False, 'error': 'Task not found'}), 404
     
@@ -1939,6 +2995,32 @@ def get_monitor_data(task_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def url_prefix_filter(prefix: str, task_id: int) -> tuple:
+    """生成URL前缀搜索的查询条件和参数
+
+    不包含协议时自动匹配http/https，以及带www.的同名域名；http://与normalize_url一致按https://匹配。
+    前缀匹配写成NOCASE下url的范围比较，整个URL不区分大小写，可以直接在(task_id, url COLLATE NOCASE)
+    索引上定位，不必逐条扫描任务的所有URL。每个范围都带上task_id，SQLite才会对OR的各项分别走索引。
+    """
+    # NOCASE按小写比较，边界也用小写计算
+    scheme, sep, rest = prefix.lower().partition('://')
+    if not sep:
+        scheme, rest = None, prefix.lower()
+    if scheme is not None:
+        prefixes = [f"{'https' if scheme == 'http' else scheme}://{rest}"]
+    else:
+        hosts = [rest] if rest.startswith('www.') else [rest, f'www.{rest}']
+        prefixes = [f'{scheme}://{host}' for scheme in ('https', 'http') for host in hosts]
+    
+    params = []
+    for p in prefixes:
+        # 以p开头的字符串都落在[p, p的末字符加1)区间内；'@'加1是'A'，NOCASE下等同于'a'，改用'['
+        upper = chr(ord(p[-1]) + 1)
+        params.extend([task_id, p, p[:-1] + ('[' if upper == 'A' else upper)])
+    term = '(task_id = ? AND url >= ? COLLATE NOCASE AND url < ? COLLATE NOCASE)'
+    return ' AND (' + ' OR '.join([term] * len(prefixes)) + ')', params
+
+
 @app.route('/api/v1/tasks/<int:task_id>/urls', methods=['GET'])
 def get_task_urls(task_id):
     """获取任务的URL列表"""
@@ -1949,126 +3031,111 @@ def get_task_urls(task_id):
         content_type = request.args.get('content_type', '')
         prefix = request.args.get('prefix', '')  # URL前缀搜索
         ext = request.args.get('ext', '')  # 文件后缀筛选
+        # 游标分页：上一页返回的next_cursor，提供时忽略page，直接从索引中的该位置继续读取
+        page_cursor = request.args.get('cursor', '')
+        after = None
+        if page_cursor:
+            try:
+                after_created_at, after_id = json.loads(base64.urlsafe_b64decode(page_cursor))
+                # created_at为NULL的记录游标中是null，保持为None，不能转成字符串'None'
+                if after_created_at is not None and not isinstance(after_created_at, str):
+                    raise ValueError('created_at must be a string or null')
+                after = (after_created_at, int(after_id))
+            except Exception:
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
         
         logger.info(f"Loading URLs for task {task_id} with filters: status={status}, prefix={prefix}, ext={ext}, page={page}")
         
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        # 构建查询
-        query = 'SELECT * FROM url_records WHERE task_id = ?'
-        params = [task_id]
-        
-        if status:
-            query += ' AND status = ?'
-            params.append(status)
-        
-        # URL前缀搜索 - 智能匹配
-        if prefix:
-            # 如果用户输入的不包含协议，尝试匹配多种可能的格式
-            if not prefix.startswith(('http://', 'https://')):
-                query += ' AND (url LIKE ? OR url LIKE ? OR url LIKE ?)'
-                params.extend([
-                    f'https://{prefix}%',  # https://前缀
-                    f'http://{prefix}%',   # http://前缀
-                    f'%{prefix}%'          # 包含搜索
-                ])
-            else:
-                query += ' AND url LIKE ?'
-                params.append(f'{prefix}%')
-        
-        # 文件后缀筛选
-        if ext:
-            query += ' AND url LIKE ?'
-            params.append(f'%{ext}')
-        
-        if content_type:
-            if content_type == 'image':
-                query += ' AND content_type LIKE ?'
-                params.append('image/%')
-            elif content_type == 'video':
-                query += ' AND content_type LIKE ?'
-                params.append('video/%')
-            elif content_type == 'audio':
-                query += ' AND content_type LIKE ?'
-                params.append('audio/%')
-            elif content_type == 'other':
-                query += ''' AND (content_type IS NULL OR (
-                            content_type NOT LIKE 'text/%' 
-                            AND content_type NOT LIKE 'image/%' 
-                            AND content_type NOT LIKE 'video/%' 
-                            AND content_type NOT LIKE 'audio/%' 
-                            AND content_type != 'application/pdf'
-                            AND content_type != 'application/javascript'
-                            AND content_type != 'application/json'
-                            AND content_type != 'application/zip')) '''
-            else:
-                query += ' AND content_type = ?'
-                params.append(content_type)
-        
-        query += ' ORDER BY created_at DESC LIMIT ? OFFSET ?'
-        params.extend([page_size, (page - 1) * page_size])
-        
-        logger.info(f"Executing query: {query}")
-        logger.info(f"Query params: {params}")
-        
-        cursor.execute(query, params)
-        urls = [dict(row) for row in cursor.fetchall()]
-        
-        logger.info(f"Found {len(urls)} URLs matching filters")
-        
-        # 获取总数
-        count_query = 'SELECT COUNT(*) as total FROM url_records WHERE task_id = ?'
-        count_params = [task_id]
-        if status:
-            count_query += ' AND status = ?'
-            count_params.append(status)
-        
-        if prefix:
-            # 同样的智能匹配逻辑
-            if not prefix.startswith(('http://', 'https://')):
-                count_query += ' AND (url LIKE ? OR url LIKE ? OR url LIKE ?)'
-                count_params.extend([
-                    f'https://{prefix}%',
-                    f'http://{prefix}%',
-                    f'%{prefix}%'
-                ])
+            # 构建过滤条件，列表查询和总数查询共用
+            where = 'task_id = ?'
+            where_params = [task_id]
+        
+            if status:
+                where += ' AND status = ?'
+                where_params.append(status)
+        
+            # URL前缀搜索 - 智能匹配
+            if prefix:
+                prefix_sql, prefix_params = url_prefix_filter(prefix, task_id)
+                where += prefix_sql
+                where_params.extend(prefix_params)
+        
+            # 文件后缀筛选
+            if ext:
+                where += ' AND url LIKE ?'
+                where_params.append(f'%{ext}')
+        
+            if content_type:
+                if content_type == 'image':
+                    where += ' AND content_type LIKE ?'
+                    where_params.append('image/%')
+                elif content_type == 'video':
+                    where += ' AND content_type LIKE ?'
+                    where_params.append('video/%')
+                elif content_type == 'audio':
+                    where += ' AND content_type LIKE ?'
+                    where_params.append('audio/%')
+                elif content_type == 'other':
+                    where += ''' AND (content_type IS NULL OR (
+                                content_type NOT LIKE 'text/%' 
+                                AND content_type NOT LIKE 'image/%' 
+                                AND content_type NOT LIKE 'video/%' 
+                                AND content_type NOT LIKE 'audio/%' 
+                                AND content_type != 'application/pdf'
+                                AND content_type != 'application/javascript'
+                                AND content_type != 'application/json'
+                                AND content_type != 'application/zip')) '''
+                else:
+                    where += ' AND content_type = ?'
+                    where_params.append(content_type)
+        
+            query = f'SELECT * FROM url_records WHERE {where}'
+            # 游标分页按(created_at, id)定位，id保证同一时间创建的记录也有确定的顺序；
+            # 倒序时created_at为NULL的记录排在最后，与按页码分页的顺序一致
+            offset = None
+            if after and after[0] is None:
+                # 游标已在created_at为NULL的部分，只按id继续
+                queries = [(query + ' AND created_at IS NULL AND id < ? ORDER BY id DESC LIMIT ?',
+                            where_params + [after[1]])]
+            elif after:
+                # 先读完created_at不为NULL的部分，本页未取满时再接着读NULL的部分
+                queries = [(query + ' AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?',
+                            where_params + list(after)),
+                           (query + ' AND created_at IS NULL ORDER BY id DESC LIMIT ?', where_params)]
             else:
-                count_query += ' AND url LIKE ?'
-                count_params.append(f'{prefix}%')
-        
-        if ext:
-            count_query += ' AND url LIKE ?'
-            count_params.append(f'%{ext}')
-        
-        if content_type:
-            if content_type == 'image':
-                count_query += ' AND content_type LIKE ?'
-                count_params.append('image/%')
-            elif content_type == 'video':
-                count_query += ' AND content_type LIKE ?'
-                count_params.append('video/%')
-            elif content_type == 'audio':
-                count_query += ' AND content_type LIKE ?'
-                count_params.append('audio/%')
-            elif content_type == 'other':
-                count_query += ''' AND (content_type IS NULL OR (
-                                  content_type NOT LIKE 'text/%' 
-                                  AND content_type NOT LIKE 'image/%' 
-                                  AND content_type NOT LIKE 'video/%' 
-                                  AND content_type NOT LIKE 'audio/%' 
-                                  AND content_type != 'application/pdf'
-                                  AND content_type != 'application/javascript'
-                                  AND content_type != 'application/json'
-                                  AND content_type != 'application/zip')) '''
+                offset = (page - 1) * page_size
+                queries = [(query + ' ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?',
+                            where_params + [page_size, offset])]
+        
+            urls = []
+            for page_query, params in queries:
+                if len(urls) == page_size:
+                    break
+                if offset is None:
+                    params = params + [page_size - len(urls)]
+                logger.info(f"Executing query: {page_query}")
+                logger.info(f"Query params: {params}")
+                cursor.execute(page_query, params)
+                urls.extend(dict(row) for row in cursor.fetchall())
+        
+            logger.info(f"Found {len(urls)} URLs matching filters")
+        
+            # 获取总数：按页码分页且本页未取满时，总数就是偏移量加本页数量，不必再COUNT
+            if offset is not None and len(urls) < page_size and (urls or offset == 0):
+                total = offset + len(urls)
             else:
-                count_query += ' AND content_type = ?'
-                count_params.append(content_type)
+                cursor.execute(f'SELECT COUNT(*) as total FROM url_records WHERE {where}', where_params)
+                total = cursor.fetchone()['total']
         
-        cursor.execute(count_query, count_params)
-        total = cursor.fetchone()['total']
         
-        conn.close()
+        # 本页已满时返回下一页的游标
+        next_cursor = None
+        if len(urls) == page_size:
+            last = urls[-1]
+            next_cursor = base64.urlsafe_b64encode(json.dumps([last['created_at'], last['id']]).encode()).decode()
         
         return jsonify({
             'success': True,
@@ -2076,7 +3143,8 @@ def get_task_urls(task_id):
                 'urls': urls,
                 'total': total,
                 'page': page,
-                'page_size': page_size
+                'page_size': page_size,
+                'next_cursor': next_cursor
             }
         })
     
@@ -2091,52 +3159,33 @@ def get_task_urls(task_id):
 def get_task_stats(task_id):
     """获取任务统计信息"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        data = get_cached_stats('stats', task_id)
+        if data is not None:
+            return jsonify({'success': True, 'data': data})
         
-        # 文件类型统计
-        cursor.execute('''
-            SELECT content_type, COUNT(*) as count, SUM(file_size) as total_size
-            FROM url_records
-            WHERE task_id = ? AND status = 'completed'
-            GROUP BY content_type
-            ORDER BY count DESC
-        ''', (task_id,))
-        file_types = [dict(row) for row in cursor.fetchall()]
-        
-        # 域名统计
-        cursor.execute('''
-            SELECT COUNT(DISTINCT 
-                CASE 
-                    WHEN url LIKE 'http://%' THEN SUBSTR(url, 8, INSTR(SUBSTR(url, 8), '/') - 1)
-                    WHEN url LIKE 'https://%' THEN SUBSTR(url, 9, INSTR(SUBSTR(url, 9), '/') - 1)
-                    ELSE url
-                END
-            ) as domain_count
-            FROM url_records
-            WHERE task_id = ?
-        ''', (task_id,))
-        domain_count = cursor.fetchone()['domain_count']
-        
-        # 状态统计
-        cursor.execute('''
-            SELECT status, COUNT(*) as count
-            FROM url_records
-            WHERE task_id = ?
-            GROUP BY status
-        ''', (task_id,))
-        status_stats = [dict(row) for row in cursor.fetchall()]
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        conn.close()
+            # 文件类型统计
+            cursor.execute(STATS_SQL['file_types'], (task_id,))
+            file_types = [dict(row) for row in cursor.fetchall()]
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'file_types': file_types,
-                'domain_count': domain_count,
-                'status_stats': status_stats
-            }
-        })
+            # 域名统计
+            cursor.execute(STATS_SQL['domain_count'], (task_id,))
+            domain_count = cursor.fetchone()['domain_count']
+        
+            # 状态统计
+            cursor.execute(STATS_SQL['status_stats'], (task_id,))
+            status_stats = [dict(row) for row in cursor.fetchall()]
+        
+        
+        data = {
+            'file_types': file_types,
+            'domain_count': domain_count,
+            'status_stats': status_stats
+        }
+        set_cached_stats('stats', task_id, data)
+        return jsonify({'success': True, 'data': data})
     
     except Exception as e:
         logger.error(f"Failed to get task stats: {e}", exc_info=True)
@@ -2147,8 +3196,7 @@ def get_task_stats(task_id):
 def get_active_crawlers():
     """获取活跃的爬虫列表（调试用）"""
     try:
-        with crawler_lock:
-            active_list = list(active_crawlers.keys())
+        active_list = list(active_crawlers.keys())
         return jsonify({'success': True, 'active_crawlers': active_list})
     except Exception as e:
         logger.error(f"Failed to get active crawlers: {e}", exc_info=True)
@@ -2177,21 +3225,59 @@ def force_cleanup_task(task_id):
 
 @app.route('/api/v1/tasks/<int:task_id>/export', methods=['GET'])
 def export_task_data(task_id):
-    """导出任务数据"""
+    """导出任务数据
+
+    按批读取URL记录并流式输出，不在内存中保存全部记录。默认输出{"success": true, "data": [...]}，
+    format=ndjson时每行输出一条记录的JSON。
+    """
+    ndjson = request.args.get('format') == 'ndjson'
+    if orjson:
+        dumps = lambda obj: orjson.dumps(obj).decode('utf-8')
+    else:
+        dumps = lambda obj: json.dumps(obj, ensure_ascii=False)
+    
+    # 连接在响应关闭时归还，不能用with db.borrow()
+    conn = None
     try:
-        conn = db.get_connection()
+        conn = db.acquire_connection()
         cursor = conn.cursor()
-        
         cursor.execute('SELECT * FROM url_records WHERE task_id = ?', (task_id,))
-        urls = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return jsonify({'success': True, 'data': urls})
-    
     except Exception as e:
+        if conn is not None:
+            db.release_connection(conn)
         logger.error(f"Failed to export task data: {e}", exc_info=True)
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    def generate():
+        try:
+            if not ndjson:
+                yield '{"success": true, "data": ['
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                if ndjson:
+                    yield ''.join(dumps(dict(row)) + '\n' for row in rows)
+                else:
+                    yield separator + ','.join(dumps(dict(row)) for row in rows)
+                    separator = ','
+            if not ndjson:
+                yield ']}'
+        except Exception as e:
+            # 响应已开始输出，无法再返回错误状态码
+            logger.error(f"Failed to export task data: {e}", exc_info=True)
+    
+    def release():
+        # 先关闭游标结束SELECT语句，释放其持有的WAL读快照，再归还连接
+        cursor.close()
+        db.release_connection(conn)
+    
+    response = Response(generate(), mimetype='application/x-ndjson' if ndjson else 'application/json')
+    # 客户端中途断开或生成器从未开始（如HEAD请求）时，生成器中的finally不会执行；
+    # 服务器关闭响应时总会调用call_on_close注册的函数
+    response.call_on_close(release)
+    return response
 
 
 @app.route('/api/v1/download', methods=['GET'])
@@ -2206,7 +3292,6 @@ def download_file():
         
         # 从URL中提取文件名，处理中文编码
         try:
-            from urllib.parse import unquote
             parsed = urlparse(url)
             
             # 先解码URL
@@ -2217,8 +3302,7 @@ def download_file():
                 filename += '.html'
             
             # 确保文件名是安全的，移除或替换非法字符
-            import re
-            filename = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', filename)
+            filename = FILENAME_UNSAFE_PATTERN.sub('_', filename)
             
             # 限制文件名长度
             if len(filename) > 200:
@@ -2232,43 +3316,68 @@ def download_file():
         # 直接通过爬虫下载，不使用任何缓存
         content = None
         content_type = 'application/octet-stream'
+        content_length = None
+        status_code = 200
+        extra_headers = {}
         
         logger.info(f"Downloading fresh content for {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive'
-        }
-        
-        # 使用会话和重试机制
-        session = requests.Session()
-        from requests.adapters import HTTPAdapter
-        from urllib3.util.retry import Retry
+        headers = dict(DOWNLOAD_HEADERS)
         
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
+        # 断点续传：转发客户端的Range头，并要求上游不压缩，使字节范围对应原始文件
+        range_header = request.headers.get('Range')
+        if range_header:
+            headers['Range'] = range_header
+            headers['Accept-Encoding'] = 'identity'
         
         try:
-            response = session.get(url, headers=headers, timeout=(10, 30), verify=True, allow_redirects=True)
-            response.raise_for_status()
+            # 使用共用的会话（带重试机制和连接池）
+            response = None
+            if request.method == 'HEAD':
+                # 只校验文件类型和大小的客户端不需要响应体，上游也只发HEAD
+                response = download_session.head(url, headers=headers, timeout=(10, 30), verify=True,
+                                                 allow_redirects=True)
+                # 服务器不支持HEAD时仍用GET，只读取响应头
+                if response.status_code in (405, 501):
+                    response.close()
+                    response = None
+            if response is None:
+                response = download_session.get(url, headers=headers, timeout=(10, 30), verify=True,
+                                                allow_redirects=True, stream=True)
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                response.close()
+                raise
             
-            content = response.content
             content_type = response.headers.get('Content-Type', 'application/octet-stream')
-            logger.info(f"Successfully downloaded {url}, size: {len(content)} bytes")
+            # 压缩传输时iter_content输出解压后的内容，上游的Content-Length不再适用
+            if 'Content-Encoding' not in response.headers:
+                content_length = response.headers.get('Content-Length')
+            # 上游按Range返回部分内容时，原样返回206和对应的范围
+            if response.status_code == 206:
+                status_code = 206
+            for name in ('Content-Range', 'Accept-Ranges'):
+                if name in response.headers:
+                    extra_headers[name] = response.headers[name]
+            
+            if request.method == 'HEAD':
+                response.close()
+                content = []
+            else:
+                # 响应体边下载边转发给客户端
+                content = stream_download(response)
+            logger.info(f"Streaming download of {url}, size: {content_length or 'unknown'} bytes")
         except requests.exceptions.HTTPError as e:
             # 如果是404，尝试返回一个简单的错误页面而不是完全失败
             if e.response.status_code == 404:
                 logger.warning(f"URL not found (404): {url}")
                 content = f"<html><body><h1>404 Not Found</h1><p>The requested URL was not found: {url}</p></body></html>".encode('utf-8')
                 content_type = 'text/html'
+            elif e.response.status_code == 416:
+                # 请求的范围超出文件大小（通常是文件已下载完整），原样返回416
+                return Response(status=416, headers={
+                    name: e.response.headers[name] for name in ('Content-Range',) if name in e.response.headers
+                })
             else:
                 raise
         except Exception as e:
@@ -2278,19 +3387,17 @@ def download_file():
             content_type = 'text/html'
         
         # 创建响应，正确处理中文文件名
-        from flask import Response
-        import urllib.parse
-        
         # RFC 5987编码中文文件名
-        encoded_filename = urllib.parse.quote(filename.encode('utf-8'))
+        encoded_filename = quote(filename.encode('utf-8'))
         
-        return Response(
-            content,
-            headers={
-                'Content-Disposition': f'attachment; filename*=UTF-8\'\'{encoded_filename}',
-                'Content-Type': content_type
-            }
-        )
+        response_headers = {
+            'Content-Disposition': f'attachment; filename*=UTF-8\'\'{encoded_filename}',
+            'Content-Type': content_type,
+            **extra_headers
+        }
+        if content_length:
+            response_headers['Content-Length'] = content_length
+        return Response(content, status=status_code, headers=response_headers)
     
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to download file from {url}: {e}")
@@ -2307,126 +3414,63 @@ def download_file():
 def get_task_analysis(task_id):
     """获取任务数据分析"""
     try:
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        data = get_cached_stats('analysis', task_id)
+        if data is not None:
+            return jsonify({'success': True, 'data': data})
         
-        # 深度分布
-        cursor.execute('''
-            SELECT depth, COUNT(*) as count 
-            FROM url_records 
-            WHERE task_id = ? AND status = 'completed'
-            GROUP BY depth 
-            ORDER BY depth
-        ''', (task_id,))
-        depth_distribution = [{'depth': row[0], 'count': row[1]} for row in cursor.fetchall()]
-        
-        # 文件大小分布
-        cursor.execute('''
-            SELECT 
-                CASE 
-                    WHEN file_size < 1024 THEN 0
-                    WHEN file_size < 10240 THEN 1
-                    WHEN file_size < 102400 THEN 2
-                    WHEN file_size < 1048576 THEN 3
-                    ELSE 4
-                END as size_range,
-                COUNT(*) as count
-            FROM url_records 
-            WHERE task_id = ? AND status = 'completed' AND file_size > 0
-            GROUP BY size_range
-            ORDER BY size_range
-        ''', (task_id,))
-        size_data = cursor.fetchall()
-        size_distribution = [0, 0, 0, 0, 0]
-        for row in size_data:
-            size_distribution[row[0]] = row[1]
-        
-        # 响应时间分布
-        cursor.execute('''
-            SELECT 
-                CASE 
-                    WHEN response_time < 0.1 THEN 0
-                    WHEN response_time < 0.5 THEN 1
-                    WHEN response_time < 1.0 THEN 2
-                    WHEN response_time < 5.0 THEN 3
-                    ELSE 4
-                END as time_range,
-                COUNT(*) as count
-            FROM url_records 
-            WHERE task_id = ? AND status = 'completed' AND response_time > 0
-            GROUP BY time_range
-            ORDER BY time_range
-        ''', (task_id,))
-        time_data = cursor.fetchall()
-        response_time_distribution = [0, 0, 0, 0, 0]
-        for row in time_data:
-            response_time_distribution[row[0]] = row[1]
-        
-        # 热度分布 - 从metadata中提取热度分数
-        cursor.execute('''
-            SELECT 
-                CASE 
-                    WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 100 THEN 0
-                    WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 1000 THEN 1
-                    WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 10000 THEN 2
-                    WHEN CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) < 100000 THEN 3
-                    ELSE 4
-                END as popularity_range,
-                COUNT(*) as count
-            FROM url_records 
-            WHERE task_id = ? AND status = 'completed' 
-                AND metadata IS NOT NULL 
-                AND JSON_EXTRACT(metadata, '$.popularity_score') IS NOT NULL
-                AND CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) > 0
-            GROUP BY popularity_range
-            ORDER BY popularity_range
-        ''', (task_id,))
-        popularity_data = cursor.fetchall()
-        popularity_distribution = []
-        ranges = ['0-100', '100-1k', '1k-1万', '1万-10万', '10万+']
-        range_counts = [0, 0, 0, 0, 0]
-        for row in popularity_data:
-            range_counts[row[0]] = row[1]
-        
-        for i, count in enumerate(range_counts):
-            popularity_distribution.append({'range': ranges[i], 'count': count})
-        
-        # 热度排行榜 - 获取热度最高的前10个URL
-        cursor.execute('''
-            SELECT url, title, 
-                   CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) as popularity_score,
-                   CAST(JSON_EXTRACT(metadata, '$.view_count') AS INTEGER) as view_count,
-                   CAST(JSON_EXTRACT(metadata, '$.like_count') AS INTEGER) as like_count
-            FROM url_records 
-            WHERE task_id = ? AND status = 'completed' 
-                AND metadata IS NOT NULL 
-                AND JSON_EXTRACT(metadata, '$.popularity_score') IS NOT NULL
-                AND CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) > 0
-            ORDER BY CAST(JSON_EXTRACT(metadata, '$.popularity_score') AS INTEGER) DESC
-            LIMIT 10
-        ''', (task_id,))
-        top_popular_urls = []
-        for row in cursor.fetchall():
-            top_popular_urls.append({
-                'url': row[0],
-                'title': row[1] or '无标题',
-                'popularity_score': row[2] or 0,
-                'view_count': row[3] or 0,
-                'like_count': row[4] or 0
-            })
+        with db.borrow() as conn:
+            cursor = conn.cursor()
         
-        conn.close()
+            # 深度分布
+            cursor.execute(STATS_SQL['depth_distribution'], (task_id,))
+            depth_distribution = [{'depth': row[0], 'count': row[1]} for row in cursor.fetchall()]
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'depth_distribution': depth_distribution,
-                'size_distribution': size_distribution,
-                'response_time_distribution': response_time_distribution,
-                'popularity_distribution': popularity_distribution,
-                'top_popular_urls': top_popular_urls
-            }
-        })
+            # 文件大小和响应时间分布：运行中的任务直接取爬虫的实时统计，否则读取分布统计表
+            crawler = active_crawlers.get(task_id)
+            if crawler:
+                with crawler.queue_lock:
+                    size_distribution = list(crawler.size_histogram)
+                    response_time_distribution = list(crawler.time_histogram)
+            else:
+                cursor.execute(STATS_SQL['histograms'], (task_id,))
+                row = cursor.fetchone()
+                size_distribution = json.loads(row[0]) if row else [0, 0, 0, 0, 0]
+                response_time_distribution = json.loads(row[1]) if row else [0, 0, 0, 0, 0]
+        
+            # 热度分布 - 从metadata中提取热度分数
+            cursor.execute(STATS_SQL['popularity_distribution'], (task_id,))
+            popularity_data = cursor.fetchall()
+            popularity_distribution = []
+            ranges = ['0-100', '100-1k', '1k-1万', '1万-10万', '10万+']
+            range_counts = [0, 0, 0, 0, 0]
+            for row in popularity_data:
+                range_counts[row[0]] = row[1]
+        
+            for i, count in enumerate(range_counts):
+                popularity_distribution.append({'range': ranges[i], 'count': count})
+        
+            # 热度排行榜 - 获取热度最高的前10个URL
+            cursor.execute(STATS_SQL['top_popular_urls'], (task_id,))
+            top_popular_urls = []
+            for row in cursor.fetchall():
+                top_popular_urls.append({
+                    'url': row[0],
+                    'title': row[1] or '无标题',
+                    'popularity_score': row[2] or 0,
+                    'view_count': row[3] or 0,
+                    'like_count': row[4] or 0
+                })
+        
+        
+        data = {
+            'depth_distribution': depth_distribution,
+            'size_distribution': size_distribution,
+            'response_time_distribution': response_time_distribution,
+            'popularity_distribution': popularity_distribution,
+            'top_popular_urls': top_popular_urls
+        }
+        set_cached_stats('analysis', task_id, data)
+        return jsonify({'success': True, 'data': data})
     
     except Exception as e:
         logger.error(f"Failed to get task analysis: {e}", exc_info=True)
@@ -2436,11 +3480,19 @@ def get_task_analysis(task_id):
 # 静态文件路由已在前面定义，这里删除重复定义
 
 # WebSocket事件处理器
+@functools.lru_cache(maxsize=4096)
+def task_room(task_id) -> str:
+    """任务监控房间名；加入、推送和关闭房间共用，同一任务重复使用同一个字符串"""
+    return f'task_{task_id}'
+
+ALL_TASKS_ROOM = 'tasks_all'  # 订阅全部任务推送的房间，管理面板加入一次即可收到所有任务的数据
+CONNECT_MESSAGE = 'WebSocket连接成功'
+
 @socketio.on('connect')
 def handle_connect():
     """客户端连接事件"""
     logger.info(f"Client connected: {request.sid}")
-    emit('connected', {'message': 'WebSocket连接成功'})
+    emit('connected', {'message': CONNECT_MESSAGE})
 
 @socketio.on('disconnect')
 def handle_disconnect():
@@ -2449,33 +3501,132 @@ def handle_disconnect():
 
 @socketio.on('join_task')
 def handle_join_task(data):
-    """客户端加入任务监控房间"""
+    """客户端加入任务监控房间，task_ids传列表时一次加入多个房间"""
+    task_ids = data.get('task_ids')
+    if task_ids:
+        for task_id in task_ids:
+            join_room(task_room(task_id))
+        logger.info(f"Client {request.sid} joined {len(task_ids)} task rooms")
+        emit('joined_tasks', {'task_ids': task_ids})
+        return
     task_id = data.get('task_id')
     if task_id:
-        join_room(f'task_{task_id}')
+        join_room(task_room(task_id))
         logger.info(f"Client {request.sid} joined task {task_id} room")
         emit('joined_task', {'task_id': task_id})
 
 @socketio.on('leave_task')
 def handle_leave_task(data):
-    """客户端离开任务监控房间"""
-    task_id = data.get('task_id')
-    if task_id:
-        leave_room(f'task_{task_id}')
-        logger.info(f"Client {request.sid} left task {task_id} room")
+    """客户端离开任务监控房间，task_ids传列表时一次离开多个房间"""
+    task_ids = data.get('task_ids') or [data.get('task_id')]
+    for task_id in task_ids:
+        if task_id:
+            leave_room(task_room(task_id))
+            logger.info(f"Client {request.sid} left task {task_id} room")
+
+@socketio.on('join_all_tasks')
+def handle_join_all_tasks(data=None):
+    """客户端订阅全部任务的监控数据和状态变更，推送数据中的task_id用于区分任务"""
+    join_room(ALL_TASKS_ROOM)
+    logger.info(f"Client {request.sid} joined all tasks room")
+    emit('joined_all_tasks')
+
+@socketio.on('leave_all_tasks')
+def handle_leave_all_tasks(data=None):
+    """客户端取消订阅全部任务"""
+    leave_room(ALL_TASKS_ROOM)
+    logger.info(f"Client {request.sid} left all tasks room")
+
+# 监控推送合并缓冲：每个任务只保留最新一份监控数据，由后台任务统一发送。
+# 监控数据是完整快照，旧数据被新数据覆盖即可，编码和发送也不再占用爬虫线程。
+# 任务状态变更不能合并，按发生顺序排队，由同一个后台任务在监控数据之前发送
+MONITOR_FLUSH_INTERVAL = 0.05  # 合并窗口（秒）
+STATUS_BUFFER_MAX_SIZE = 10000  # 状态变更队列上限，客户端发送过慢时丢弃最旧的事件
+monitor_buffer = {}  # task_id -> 最新监控数据
+status_buffer = deque(maxlen=STATUS_BUFFER_MAX_SIZE)  # (task_id, 状态数据)
+monitor_buffer_lock = threading.Lock()
+monitor_flush_pending = False
+
+def _flush_monitor_buffer():
+    """等待合并窗口结束后发送排队的任务状态变更和各任务的最新监控数据"""
+    global monitor_flush_pending
+    socketio.sleep(MONITOR_FLUSH_INTERVAL)
+    with monitor_buffer_lock:
+        statuses = list(status_buffer)
+        status_buffer.clear()
+        pending = list(monitor_buffer.items())
+        monitor_buffer.clear()
+        monitor_flush_pending = False
+    # 同时加入任务房间和全部任务房间的客户端只会收到一次。
+    # 房间在合并窗口内可能已经清空，此时必须跳过：to为空列表时emit会发给所有客户端
+    for task_id, status_data in statuses:
+        rooms = task_broadcast_rooms(task_id)
+        if not rooms:
+            continue
+        try:
+            socketio.emit('task_status_update', status_data, to=rooms)
+        except Exception as e:
+            logger.error(f"Failed to emit task status for task {task_id}: {e}", exc_info=True)
+    for task_id, monitor_data in pending:
+        rooms = task_broadcast_rooms(task_id)
+        if not rooms:
+            continue
+        try:
+            socketio.emit('monitor_update', monitor_data, to=rooms)
+        except Exception as e:
+            logger.error(f"Failed to emit monitor data for task {task_id}: {e}", exc_info=True)
+
+def task_broadcast_rooms(task_id) -> list:
+    """任务推送的目标房间：任务房间和全部任务房间中有客户端的那些
+
+    结果为空时跳过推送，省去编码（和Redis发布）的开销。
+    使用Redis消息队列时本进程只知道本地客户端，其他进程可能有订阅者，因此总是推送到两个房间。
+    """
+    rooms = (task_room(task_id), ALL_TASKS_ROOM)
+    if 'message_queue' in socketio_options:
+        return list(rooms)
+    members = socketio.server.manager.rooms.get('/', {})
+    return [room for room in rooms if members.get(room)]
 
 def broadcast_monitor_data(task_id, monitor_data):
-    """广播监控数据到指定任务房间"""
-    socketio.emit('monitor_update', monitor_data, room=f'task_{task_id}')
+    """广播监控数据到指定任务房间（合并窗口内只发送最新一份）"""
+    if not task_broadcast_rooms(task_id):
+        return
+    with monitor_buffer_lock:
+        monitor_buffer[task_id] = monitor_data
+    _schedule_broadcast_flush()
 
 def broadcast_task_status(task_id, status_data):
-    """广播任务状态变更"""
-    socketio.emit('task_status_update', status_data, room=f'task_{task_id}')
+    """广播任务状态变更（排队后由后台任务发送，调用线程不等待网络）"""
+    if not task_broadcast_rooms(task_id):
+        return
+    with monitor_buffer_lock:
+        status_buffer.append((task_id, status_data))
+    _schedule_broadcast_flush()
+
+def _schedule_broadcast_flush():
+    """缓冲中有待发送数据且没有等待中的后台发送任务时启动一个"""
+    global monitor_flush_pending
+    with monitor_buffer_lock:
+        if monitor_flush_pending:
+            return
+        monitor_flush_pending = True
+    socketio.start_background_task(_flush_monitor_buffer)
 
 
 if __name__ == '__main__':
     logger.info("Starting Intelligent Web Crawler System...")
     logger.info("Server running on http://localhost:8000")
     logger.info("WebSocket enabled for real-time communication")
+    raise_open_file_limit()
+    # 在启动任何其他线程之前创建解析进程池：先停下日志监听线程，fork完成后再启动，
+    # 期间的日志记录留在队列中，监听线程重新启动后照常输出
+    log_listener.stop()
+    init_parse_pool()
+    log_listener.start()
     # 使用SocketIO运行，支持WebSocket连接
-    socketio.run(app, host='0.0.0.0', port=8000, debug=False)
+    # threading模式下由多线程Werkzeug服务器处理请求，每个请求和WebSocket连接各占一个线程；
+    # 爬虫依赖真实线程，不改用ASGI/事件循环。没有终端（如由进程管理器启动）时Flask-SocketIO默认拒绝启动，
+    # 确认要这样部署时设置环境变量ALLOW_UNSAFE_WERKZEUG=1
+    socketio.run(app, host='0.0.0.0', port=8000, debug=False,
+                 allow_unsafe_werkzeug=os.environ.get('ALLOW_UNSAFE_WERKZEUG') == '1')
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""app模块的接口测试，运行：python -m unittest discover tests"""
+
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# app在导入时于当前目录创建crawler.db，先切换到临时目录
+os.chdir(tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as crawler_app  # noqa: E402
+
+
+class UrlPrefixFilterTest(unittest.TestCase):
+    """URL列表接口的prefix过滤"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = crawler_app.app.test_client()
+        response = cls.client.post('/api/v1/tasks', json={'name': 'prefix', 'url': 'https://example.com/'})
+        cls.task_id = response.get_json()['data']['id']
+        with crawler_app.db.borrow() as conn:
+            conn.executemany(
+                'INSERT INTO url_records (task_id, url, status) VALUES (?, ?, ?)',
+                [(cls.task_id, url, 'completed') for url in (
+                    'https://example.com/',
+                    'https://example.com/Path/a',
+                    'https://example.com/Path/b',
+                    'https://example.com/other',
+                    'https://Example.com/Up',
+                )]
+            )
+            conn.commit()
+
+    def total(self, prefix: str) -> int:
+        response = self.client.get(f'/api/v1/tasks/{self.task_id}/urls', query_string={'prefix': prefix})
+        return response.get_json()['data']['total']
+
+    def test_host_is_case_insensitive(self):
+        self.assertEqual(self.total('Example.com/Path'), 2)
+        self.assertEqual(self.total('https://EXAMPLE.COM/Path'), 2)
+
+    def test_explicit_http_matches_stored_https(self):
+        self.assertEqual(self.total('http://example.com/Path'), 2)
+        self.assertEqual(self.total('HTTP://example.com/'), 5)
+
+    def test_stored_url_case_is_ignored(self):
+        self.assertEqual(self.total('example.com/up'), 1)
+        self.assertEqual(self.total('Example.com/Up'), 1)
+        self.assertEqual(self.total('example.com/path'), 2)
+
+
+class UrlCursorPagingTest(unittest.TestCase):
+    """URL列表接口的游标分页与按页码分页返回相同的记录"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = crawler_app.app.test_client()
+        response = cls.client.post('/api/v1/tasks', json={'name': 'cursor', 'url': 'https://example.org/'})
+        cls.task_id = response.get_json()['data']['id']
+        with crawler_app.db.borrow() as conn:
+            # 只有一条记录有created_at，其余为NULL
+            conn.execute('INSERT INTO url_records (task_id, url, status, created_at) VALUES (?, ?, ?, ?)',
+                         (cls.task_id, 'https://example.org/dated', 'completed', '2026-01-01T00:00:00'))
+            conn.executemany(
+                'INSERT INTO url_records (task_id, url, status) VALUES (?, ?, ?)',
+                [(cls.task_id, f'https://example.org/{i}', 'completed') for i in range(5)]
+            )
+            conn.commit()
+
+    def fetch(self, **args) -> dict:
+        response = self.client.get(f'/api/v1/tasks/{self.task_id}/urls', query_string={'page_size': 2, **args})
+        return response.get_json()['data']
+
+    def test_cursor_pages_match_numbered_pages(self):
+        by_page = [url['id'] for page in (1, 2, 3) for url in self.fetch(page=page)['urls']]
+        by_cursor = []
+        data = self.fetch()
+        while True:
+            by_cursor.extend(url['id'] for url in data['urls'])
+            if not data['next_cursor']:
+                break
+            data = self.fetch(cursor=data['next_cursor'])
+        self.assertEqual(len(by_page), 6)
+        self.assertEqual(by_cursor, by_page)
+
+    def test_non_string_created_at_is_rejected(self):
+        cursor = base64.urlsafe_b64encode(json.dumps([123, 1]).encode()).decode()
+        response = self.client.get(f'/api/v1/tasks/{self.task_id}/urls', query_string={'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+
+
+class BroadcastRoomTest(unittest.TestCase):
+    """监控数据和状态变更只推送给任务房间中的客户端"""
+
+    UPDATE_EVENTS = ('monitor_update', 'task_status_update')
+
+    def setUp(self):
+        self.watcher = crawler_app.socketio.test_client(crawler_app.app)
+        self.outsider = crawler_app.socketio.test_client(crawler_app.app)
+        self.addCleanup(self.watcher.disconnect)
+        self.addCleanup(self.outsider.disconnect)
+
+    def received(self, client) -> list:
+        return [message['name'] for message in client.get_received() if message['name'] in self.UPDATE_EVENTS]
+
+    def wait_for_flush(self):
+        time.sleep(crawler_app.MONITOR_FLUSH_INTERVAL * 4)
+
+    def test_room_member_receives_updates(self):
+        self.watcher.emit('join_task', {'task_id': 7})
+        crawler_app.broadcast_task_status(7, {'task_id': 7, 'status': 'running'})
+        crawler_app.broadcast_monitor_data(7, {'task_id': 7})
+        self.wait_for_flush()
+        self.assertEqual(self.received(self.watcher), ['task_status_update', 'monitor_update'])
+        self.assertEqual(self.received(self.outsider), [])
+
+    def test_room_emptied_before_flush_sends_nothing(self):
+        self.watcher.emit('join_task', {'task_id': 7})
+        crawler_app.broadcast_task_status(7, {'task_id': 7, 'status': 'running'})
+        crawler_app.broadcast_monitor_data(7, {'task_id': 7})
+        # 合并窗口结束前离开房间，房间变为空
+        self.watcher.emit('leave_task', {'task_id': 7})
+        self.wait_for_flush()
+        self.assertEqual(self.received(self.watcher), [])
+        self.assertEqual(self.received(self.outsider), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -92,8 +92,8 @@ function updateConnectionStatus(connected) {
 function initializeWebSocket() {
     console.log('Initializing WebSocket connection...');
     
-    // 连接到Socket.IO服务器
-    socket = io(API_BASE);
+    // 连接到Socket.IO服务器，优先直接使用WebSocket，不可用时回退到长轮询
+    socket = io(API_BASE, { transports: ['websocket', 'polling'] });
     
     // 连接成功事件
     socket.on('connect', () => {
@@ -635,7 +635,9 @@ async function createTask(event) {
         request_interval: parseFloat(formData.get('request_interval')),
         retry_times: parseInt(formData.get('retry_times')),
         respect_robots: formData.get('respect_robots') === 'on',
-        allow_cross_domain: formData.get('allow_cross_domain') === 'on'
+        allow_cross_domain: formData.get('allow_cross_domain') === 'on',
+        collapse_url_variants: formData.get('collapse_url_variants') === 'on',
+        skip_duplicate_content: formData.get('skip_duplicate_content') === 'on'
     };
     
     try {
@@ -768,6 +770,8 @@ async function showEditTaskModal() {
         document.getElementById('editTaskRetry').value = task.retry_times || 3;
         document.getElementById('editTaskRobots').checked = Boolean(task.respect_robots);
         document.getElementById('editTaskCrossDomain').checked = Boolean(task.allow_cross_domain);
+        document.getElementById('editTaskCollapseVariants').checked = Boolean(task.collapse_url_variants);
+        document.getElementById('editTaskSkipDuplicates').checked = Boolean(task.skip_duplicate_content);
         
         document.getElementById('editTaskModal').classList.add('show');
     } catch (error) {
@@ -806,7 +810,9 @@ async function updateTask(event) {
         request_interval: parseFloat(document.getElementById('editTaskInterval').value),
         retry_times: parseInt(document.getElementById('editTaskRetry').value),
         respect_robots: document.getElementById('editTaskRobots').checked,
-        allow_cross_domain: document.getElementById('editTaskCrossDomain').checked
+        allow_cross_domain: document.getElementById('editTaskCrossDomain').checked,
+        collapse_url_variants: document.getElementById('editTaskCollapseVariants').checked,
+        skip_duplicate_content: document.getElementById('editTaskSkipDuplicates').checked
     };
     
     // 调试输出任务数据